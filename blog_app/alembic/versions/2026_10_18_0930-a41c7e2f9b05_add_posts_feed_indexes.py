@@ -0,0 +1,72 @@
+"""add composite indexes for post feeds
+
+Revision ID: a41c7e2f9b05
+Revises: 5e2a9c71d4b8
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a41c7e2f9b05"
+down_revision: Union[str, Sequence[str], None] = "5e2a9c71d4b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_posts_created_at_id",
+            "posts",
+            ["created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_posts_owner_id_created_at",
+            "posts",
+            ["owner_id", "created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # owner_id теперь ведущая колонка составного индекса
+        op.drop_index(
+            "ix_posts_owner_id",
+            table_name="posts",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_posts_owner_id",
+            "posts",
+            ["owner_id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_posts_owner_id_created_at",
+            table_name="posts",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_posts_created_at_id",
+            table_name="posts",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,42 @@
+"""add posts_tags (tag_id, post_id) index
+
+Revision ID: e7b4f0d2c815
+Revises: c93d15e0a6f2
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b4f0d2c815"
+down_revision: Union[str, Sequence[str], None] = "c93d15e0a6f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_posts_tags_tag_id_post_id",
+            "posts_tags",
+            ["tag_id", "post_id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_posts_tags_tag_id_post_id",
+            table_name="posts_tags",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,45 @@
+"""add posts title prefix index
+
+Revision ID: 3f8a6b1e90d4
+Revises: e7b4f0d2c815
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f8a6b1e90d4"
+down_revision: Union[str, Sequence[str], None] = "e7b4f0d2c815"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Фильтры по тегам, автору и дате уже покрыты индексами
+    # ix_posts_tags_tag_id_post_id, ix_posts_owner_id_created_at, ix_posts_created_at_id
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_posts_title_c",
+            "posts",
+            [sa.text('title COLLATE "C"')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_posts_title_c",
+            table_name="posts",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,43 @@
+"""add tags name prefix index
+
+Revision ID: b6f1d83c24e7
+Revises: 8d2c5e47a1b3
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b6f1d83c24e7"
+down_revision: Union[str, Sequence[str], None] = "8d2c5e47a1b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tags_name_c",
+            "tags",
+            [sa.text('name COLLATE "C"')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_tags_name_c",
+            table_name="tags",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,92 @@
+"""add content_versions counters with triggers
+
+Revision ID: 2f6a9d0c4e18
+Revises: b6f1d83c24e7
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2f6a9d0c4e18"
+down_revision: Union[str, Sequence[str], None] = "b6f1d83c24e7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Таблица -> счётчики, которые двигает любое её изменение
+TRIGGERS = {
+    "posts": ["posts"],
+    "posts_tags": ["posts"],
+    "tags": ["posts"],
+}
+
+# Триггеры на оператор, а не на строку: COPY на миллион строк двигает счётчик один раз.
+# Пустые операторы и UPDATE без фактических изменений (SET name = name) счётчик не трогают.
+BUMP_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_content_versions() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed boolean;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := EXISTS (SELECT FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        changed := EXISTS (SELECT FROM old_rows);
+    ELSE
+        changed := EXISTS (SELECT * FROM new_rows EXCEPT SELECT * FROM old_rows);
+    END IF;
+    IF changed THEN
+        UPDATE content_versions SET version = version + 1 WHERE name = ANY (TG_ARGV);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# Переходные таблицы нельзя объявить у триггера на несколько событий — по одному на событие
+REFERENCING = {
+    "INSERT": "NEW TABLE AS new_rows",
+    "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "OLD TABLE AS old_rows",
+}
+
+
+def create_version_triggers(triggers: dict[str, list[str]]) -> None:
+    for table, names in triggers.items():
+        args = ", ".join(f"'{name}'" for name in names)
+        for event, referencing in REFERENCING.items():
+            op.execute(
+                f"CREATE TRIGGER {table}_{event.lower()}_bump_versions AFTER {event} ON {table} "
+                f"REFERENCING {referencing} FOR EACH STATEMENT EXECUTE FUNCTION bump_content_versions({args})"
+            )
+
+
+def drop_version_triggers(triggers: dict[str, list[str]]) -> None:
+    for table in triggers:
+        for event in REFERENCING:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_{event.lower()}_bump_versions ON {table}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "content_versions",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("version", sa.BigInteger(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("name", name=op.f("pk_content_versions")),
+    )
+    op.execute("INSERT INTO content_versions (name) VALUES ('posts')")
+    op.execute(BUMP_FUNCTION)
+    create_version_triggers(TRIGGERS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_version_triggers(TRIGGERS)
+    op.execute("DROP FUNCTION IF EXISTS bump_content_versions()")
+    op.drop_table("content_versions")
@@ -0,0 +1,96 @@
+"""add tags counter and tags.posts_version
+
+Revision ID: 9b3e7c51a2d6
+Revises: 2f6a9d0c4e18
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9b3e7c51a2d6"
+down_revision: Union[str, Sequence[str], None] = "2f6a9d0c4e18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REFERENCING = {
+    "INSERT": "NEW TABLE AS new_rows",
+    "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "OLD TABLE AS old_rows",
+}
+
+# Версия постов тега (для ETag GET /tags/{id}): связи тега и заголовки/даты его постов.
+# Удаление поста доходит сюда каскадом через posts_tags.
+# Теги блокируются по порядку id — параллельные записи с общими тегами не встают в deadlock.
+BUMP_TAG_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_tag_posts_versions() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    tag_ids uuid[];
+BEGIN
+    IF TG_TABLE_NAME = 'posts' THEN
+        SELECT array_agg(DISTINCT pt.tag_id) INTO tag_ids
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN posts_tags pt ON pt.post_id = n.id
+        WHERE (n.title, n.created_at) IS DISTINCT FROM (o.title, o.created_at);
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT tag_id) INTO tag_ids FROM new_rows;
+    ELSE
+        SELECT array_agg(DISTINCT tag_id) INTO tag_ids FROM old_rows;
+    END IF;
+    IF tag_ids IS NOT NULL THEN
+        UPDATE tags SET posts_version = tags.posts_version + 1
+        FROM (SELECT id FROM tags WHERE id = ANY (tag_ids) ORDER BY id FOR UPDATE) locked
+        WHERE tags.id = locked.id;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def _recreate_version_triggers(table: str, names: list[str]) -> None:
+    args = ", ".join(f"'{name}'" for name in names)
+    for event, referencing in REFERENCING.items():
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_{event.lower()}_bump_versions ON {table}")
+        op.execute(
+            f"CREATE TRIGGER {table}_{event.lower()}_bump_versions AFTER {event} ON {table} "
+            f"REFERENCING {referencing} FOR EACH STATEMENT EXECUTE FUNCTION bump_content_versions({args})"
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "tags",
+        sa.Column("posts_version", sa.BigInteger(), server_default="0", nullable=False),
+    )
+    op.execute("INSERT INTO content_versions (name) VALUES ('tags')")
+    # post_count в GET /tags/ меняется со связями, имена — с тегами
+    _recreate_version_triggers("posts_tags", ["posts", "tags"])
+    _recreate_version_triggers("tags", ["posts", "tags"])
+
+    op.execute(BUMP_TAG_FUNCTION)
+    for table, event in (("posts_tags", "INSERT"), ("posts_tags", "DELETE"), ("posts", "UPDATE")):
+        op.execute(
+            f"CREATE TRIGGER {table}_{event.lower()}_bump_tag_posts AFTER {event} ON {table} "
+            f"REFERENCING {REFERENCING[event]} FOR EACH STATEMENT EXECUTE FUNCTION bump_tag_posts_versions()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, event in (("posts_tags", "INSERT"), ("posts_tags", "DELETE"), ("posts", "UPDATE")):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_{event.lower()}_bump_tag_posts ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_tag_posts_versions()")
+
+    _recreate_version_triggers("posts_tags", ["posts"])
+    _recreate_version_triggers("tags", ["posts"])
+    op.execute("DELETE FROM content_versions WHERE name = 'tags'")
+    op.drop_column("tags", "posts_version")
@@ -0,0 +1,169 @@
+"""replace content_versions counter rows with an insert-only log
+
+Revision ID: c7d2e4f81a39
+Revises: 9b3e7c51a2d6
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7d2e4f81a39"
+down_revision: Union[str, Sequence[str], None] = "9b3e7c51a2d6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REFERENCING = {
+    "INSERT": "NEW TABLE AS new_rows",
+    "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "OLD TABLE AS old_rows",
+}
+TAG_POSTS_TRIGGERS = (("posts_tags", "INSERT"), ("posts_tags", "DELETE"), ("posts", "UPDATE"))
+
+# UPDATE одной строки-счётчика выстраивал всех писателей (и чанки импорта) в очередь за её блокировкой.
+# Теперь каждое изменение — INSERT строки с weight = 1, версия — сумма weight по имени:
+# вставки друг друга не ждут, а сумма, в отличие от last_value последовательности, видна только
+# после коммита — ETag не обгоняет данные. Изредка триггер сворачивает строки имени в одну
+# с той же суммой; чужие свёртки пропускаются (SKIP LOCKED), так что ожиданий нет и там.
+BUMP_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_content_versions() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed boolean;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := EXISTS (SELECT FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        changed := EXISTS (SELECT FROM old_rows);
+    ELSE
+        changed := EXISTS (SELECT * FROM new_rows EXCEPT SELECT * FROM old_rows);
+    END IF;
+    IF changed THEN
+        INSERT INTO content_version_log (name) SELECT unnest(TG_ARGV);
+        IF random() < 0.01 THEN
+            WITH folded AS (
+                DELETE FROM content_version_log
+                WHERE id IN (
+                    SELECT id FROM content_version_log WHERE name = ANY (TG_ARGV)
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING name, weight
+            )
+            INSERT INTO content_version_log (name, weight)
+            SELECT name, sum(weight) FROM folded GROUP BY name;
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# Прежние версии функций — для downgrade
+OLD_BUMP_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_content_versions() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed boolean;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := EXISTS (SELECT FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        changed := EXISTS (SELECT FROM old_rows);
+    ELSE
+        changed := EXISTS (SELECT * FROM new_rows EXCEPT SELECT * FROM old_rows);
+    END IF;
+    IF changed THEN
+        UPDATE content_versions SET version = version + 1 WHERE name = ANY (TG_ARGV);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+OLD_BUMP_TAG_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_tag_posts_versions() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    tag_ids uuid[];
+BEGIN
+    IF TG_TABLE_NAME = 'posts' THEN
+        SELECT array_agg(DISTINCT pt.tag_id) INTO tag_ids
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN posts_tags pt ON pt.post_id = n.id
+        WHERE (n.title, n.created_at) IS DISTINCT FROM (o.title, o.created_at);
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT tag_id) INTO tag_ids FROM new_rows;
+    ELSE
+        SELECT array_agg(DISTINCT tag_id) INTO tag_ids FROM old_rows;
+    END IF;
+    IF tag_ids IS NOT NULL THEN
+        UPDATE tags SET posts_version = tags.posts_version + 1
+        FROM (SELECT id FROM tags WHERE id = ANY (tag_ids) ORDER BY id FOR UPDATE) locked
+        WHERE tags.id = locked.id;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Версия постов тега блокировала строки tags — ETag тега теперь берёт общую версию постов
+    for table, event in TAG_POSTS_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_{event.lower()}_bump_tag_posts ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_tag_posts_versions()")
+    op.drop_column("tags", "posts_version")
+
+    op.create_table(
+        "content_version_log",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("weight", sa.BigInteger(), server_default="1", nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_content_version_log")),
+    )
+    op.create_index(
+        op.f("ix_content_version_log_name"),
+        "content_version_log",
+        ["name"],
+        postgresql_include=["weight"],
+    )
+    # Версии продолжаются с текущих значений — выданные ETag не повторятся
+    op.execute("INSERT INTO content_version_log (name, weight) SELECT name, version FROM content_versions")
+    op.execute(BUMP_FUNCTION)
+    op.drop_table("content_versions")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table(
+        "content_versions",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("version", sa.BigInteger(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("name", name=op.f("pk_content_versions")),
+    )
+    op.execute(
+        "INSERT INTO content_versions (name, version) "
+        "SELECT name, coalesce(sum(l.weight), 0) FROM (VALUES ('posts'), ('tags')) v (name) "
+        "LEFT JOIN content_version_log l USING (name) GROUP BY name"
+    )
+    op.execute(OLD_BUMP_FUNCTION)
+    op.drop_index(op.f("ix_content_version_log_name"), table_name="content_version_log")
+    op.drop_table("content_version_log")
+
+    op.add_column(
+        "tags",
+        sa.Column("posts_version", sa.BigInteger(), server_default="0", nullable=False),
+    )
+    op.execute(OLD_BUMP_TAG_FUNCTION)
+    for table, event in TAG_POSTS_TRIGGERS:
+        op.execute(
+            f"CREATE TRIGGER {table}_{event.lower()}_bump_tag_posts AFTER {event} ON {table} "
+            f"REFERENCING {REFERENCING[event]} FOR EACH STATEMENT EXECUTE FUNCTION bump_tag_posts_versions()"
+        )
@@ -0,0 +1,46 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+from core.config import settings
+
+
+def make_etag(*parts: Any) -> str:
+    """Сильный ETag из «версии» ресурса (метки времени, счётчики, параметры запроса)."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Для If-None-Match допустимо слабое сравнение (RFC 9110, 13.1.2)
+    candidates = (c.strip().removeprefix("W/") for c in if_none_match.split(","))
+    return etag in candidates
+
+
+def route_cache_control(request: Request, default: str) -> str:
+    route = request.scope.get("route")
+    path = getattr(route, "path", None)
+    return settings.CACHE_CONTROL_ROUTES.get(path, default)
+
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str = "no-cache",
+) -> Optional[Response]:
+    """
+    Возвращает готовый 304, если клиент прислал актуальный ETag.
+    Иначе проставляет ETag/Cache-Control в response и возвращает None —
+    обработчик продолжает обычную загрузку.
+    """
+    headers = {"ETag": etag, "Cache-Control": route_cache_control(request, cache_control)}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
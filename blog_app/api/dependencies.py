@@ -1,46 +1,204 @@
+import time
+from dataclasses import dataclass
+from typing import Any
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from api.middleware import mark_write, wrote_recently
+from core.cache import TTLCache
 from core.config import settings
-from core.db import get_session
+from core.db import get_read_session, get_session
 from core.security import decode_and_validate_token
 from models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/login")
 
 
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Минимум данных о пользователе, нужный для авторизации."""
+    id: UUID
+    username: str
+    is_active: bool
+    is_superuser: bool
+    token_version: int = 0
+
+    def token_claims(self) -> dict[str, Any]:
+        """Claims для access-токена в режиме AUTH_CLAIMS_IN_TOKEN."""
+        return {
+            "usr": self.username,
+            "act": self.is_active,
+            "su": self.is_superuser,
+            "ver": self.token_version,
+        }
+
+
+# Кэш на процесс: при нескольких воркерах устаревание ограничено TTL,
+# в своём процессе — явной инвалидацией через invalidate_principal().
+# token_version при попадании в кэш не сверяется с БД, поэтому отзыв токенов
+# на других воркерах вступает в силу не сразу, а через AUTH_CACHE_TTL_SECONDS.
+principal_cache: TTLCache[UUID, Principal] = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAXSIZE,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+)
+
+
+# user_id -> момент отзыва: токены, выданные не позже, перепроверяются по БД.
+# Живёт столько же, сколько самый долгий claims-токен.
+_token_revocations: TTLCache[UUID, int] = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAXSIZE,
+    ttl=settings.AUTH_CLAIMS_ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+
+def invalidate_principal(user_id: UUID) -> None:
+    """Вызывать при удалении пользователя или изменении is_active/is_superuser."""
+    principal_cache.invalidate(user_id)
+    _token_revocations.set(user_id, int(time.time()))
+
+
+async def revoke_user_tokens(session: AsyncSession, user_id: UUID) -> bool:
+    """
+    Отзывает все токены пользователя: refresh и access-токены в этом процессе сразу получают 401
+    (версия в токене сверяется с token_version). Воркеры, у которых принципал уже в principal_cache,
+    принимают старые access-токены ещё до AUTH_CACHE_TTL_SECONDS (в режиме AUTH_CLAIMS_IN_TOKEN —
+    до их истечения).
+    """
+    res = await session.execute(
+        update(User).where(User.id == user_id).values(token_version=User.token_version + 1)
+    )
+    await session.commit()
+    invalidate_principal(user_id)
+    return res.rowcount > 0
+
+
+def _principal_from_claims(user_id: UUID, payload: dict[str, Any]) -> Principal | None:
+    if not settings.AUTH_CLAIMS_IN_TOKEN:
+        return None
+    try:
+        principal = Principal(
+            id=user_id,
+            username=payload["usr"],
+            is_active=bool(payload["act"]),
+            is_superuser=bool(payload["su"]),
+            token_version=int(payload["ver"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+    revoked_at = _token_revocations.get(user_id)
+    if revoked_at is not None and payload.get("iat", 0) <= revoked_at:
+        return None
+    return principal
+
+
 async def get_db(session: AsyncSession = Depends(get_session)) -> AsyncSession:
     return session
 
 
-async def get_current_user(
+async def get_write_db(request: Request, session: AsyncSession = Depends(get_session)) -> AsyncSession:
+    """Основная БД для обработчиков, которые пишут; после успешного ответа read_your_writes ставит cookie."""
+    mark_write(request)
+    return session
+
+
+async def get_read_db(request: Request):
+    """Сессия на реплике; клиент, писавший последние READ_YOUR_WRITES_SECONDS, читает с основной БД."""
+    async for session in get_read_session(primary=wrote_recently(request)):
+        yield session
+
+
+async def load_principal(session: AsyncSession, user_id: UUID) -> Principal | None:
+    # Только колонки, без ORM-сущности — никаких selectin-связей (time_entries и т.п.)
+    stmt = (
+        select(User.id, User.username, User.is_active, User.is_superuser, User.token_version)
+        .where(User.id == user_id)
+    )
+    row = (await session.execute(stmt)).one_or_none()
+    if row is None:
+        return None
+    return Principal(
+        id=row.id,
+        username=row.username,
+        is_active=row.is_active,
+        is_superuser=row.is_superuser,
+        token_version=row.token_version,
+    )
+
+
+async def get_current_principal(
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_db),
-) -> User:
+) -> Principal:
     try:
         payload = decode_and_validate_token(token, expected_type="access")
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
 
-    user_id = payload.get("sub")
-    stmt = select(User).where(User.id == UUID(user_id))
+    try:
+        user_id = UUID(payload["sub"])
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+
+    principal = _principal_from_claims(user_id, payload)
+    if principal is not None:
+        return principal
+
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = await load_principal(session, user_id)
+        if not principal:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        principal_cache.set(user_id, principal)
+
+    # Токены без ver выпущены до отзывов — у них версия 0, как в refresh
+    if payload.get("ver", 0) != principal.token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    return principal
+
+
+async def get_current_active_principal(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    return principal
+
+
+async def get_current_superuser_principal(
+    principal: Principal = Depends(get_current_active_principal),
+) -> Principal:
+    if not principal.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+    return principal
+
+
+# Полная модель User — только для обработчиков, которым действительно нужна строка целиком.
+async def _load_user(session: AsyncSession, principal: Principal) -> User:
+    stmt = select(User).where(User.id == principal.id)
     user = (await session.execute(stmt)).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
-    if not current_user.is_active:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
-    return current_user
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_db),
+) -> User:
+    return await _load_user(session, principal)
 
 
-async def get_current_superuser(current_user: User = Depends(get_current_active_user)) -> User:
-    if not current_user.is_superuser:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
-    return current_user
+async def get_current_active_user(
+    principal: Principal = Depends(get_current_active_principal),
+    session: AsyncSession = Depends(get_db),
+) -> User:
+    return await _load_user(session, principal)
+
+
+async def get_current_superuser(
+    principal: Principal = Depends(get_current_superuser_principal),
+    session: AsyncSession = Depends(get_db),
+) -> User:
+    return await _load_user(session, principal)
@@ -0,0 +1,75 @@
+import time
+
+from fastapi import APIRouter, Request, Response
+
+from api.dependencies import principal_cache
+from core.cache import response_cache
+from core.db import pool_stats
+from core.metrics import REGISTRY, Counter, Gauge, Histogram
+from core.query_stats import route_template
+from core.security import password_hash_queue_depth
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса до отправки заголовков, по шаблону маршрута",
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Запросы в обработке")
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Размер тела ответа (если известен Content-Length)",
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+
+DB_POOL_CONNECTIONS = Gauge("db_pool_connections", "Соединения пула по состоянию")
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Выдачи соединений из пула")
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Выдачи, не дождавшиеся соединения")
+DB_POOL_WAIT = Counter("db_pool_checkout_seconds_total", "Суммарное время выдачи соединений")
+
+CACHE_HITS = Counter("cache_hits_total", "Попадания в кэш")
+CACHE_MISSES = Counter("cache_misses_total", "Промахи кэша")
+
+PASSWORD_HASH_QUEUE = Gauge("password_hash_queue_depth", "Задачи bcrypt в пуле (выполняются + ждут)")
+
+
+@REGISTRY.collector
+def _collect_runtime() -> None:
+    for pool, stats in pool_stats().items():
+        for state in ("checked_out", "checked_in", "overflow"):
+            DB_POOL_CONNECTIONS.set(stats[state], pool=pool, state=state)
+        DB_POOL_CHECKOUTS.set(stats["checkouts"], pool=pool)
+        DB_POOL_TIMEOUTS.set(stats["timeouts"], pool=pool)
+        DB_POOL_WAIT.set(stats["wait_seconds_total"], pool=pool)
+
+    caches = {"principal": principal_cache, "response": response_cache.backend}
+    for name, cache in caches.items():
+        # внешние бэкенды (Redis) могут не вести счётчики
+        if hasattr(cache, "hits"):
+            CACHE_HITS.set(cache.hits, cache=name)
+            CACHE_MISSES.set(cache.misses, cache=name)
+
+    PASSWORD_HASH_QUEUE.set(password_hash_queue_depth())
+
+
+async def metrics_middleware(request: Request, call_next):
+    REQUESTS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        labels = {"method": request.method, "route": route_template(request.scope), "status": status}
+        REQUEST_LATENCY.observe(time.perf_counter() - started, **labels)
+    size = response.headers.get("content-length")
+    if size is not None:
+        RESPONSE_SIZE.observe(int(size), **labels)
+    return response
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(await REGISTRY.render_async(), media_type="text/plain; version=0.0.4; charset=utf-8")
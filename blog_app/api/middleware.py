@@ -0,0 +1,78 @@
+import logging
+import math
+import time
+
+from fastapi import Request
+
+from core.config import settings
+from core.query_stats import begin_request, end_request
+
+logger = logging.getLogger(__name__)
+
+# Метка «клиент недавно писал»: до этого момента (unix time) его чтения идут на основную БД
+READ_YOUR_WRITES_COOKIE = "ryw_until"
+
+
+def mark_write(request: Request) -> None:
+    # Ставит get_write_db: логин, refresh и logout пишут только токены и метку не получают
+    request.state.wrote = True
+
+
+def wrote_recently(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def read_your_writes(request: Request, call_next):
+    """После успешной записи (обработчик с get_write_db) ставит cookie, по которой get_read_db выбирает основную БД."""
+    response = await call_next(request)
+    if (
+        settings.DATABASE_REPLICA_URLS
+        and getattr(request.state, "wrote", False)
+        and response.status_code < 400
+    ):
+        window = settings.READ_YOUR_WRITES_SECONDS
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            str(time.time() + window),
+            max_age=math.ceil(window),
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
+async def sql_timing(request: Request, call_next):
+    """
+    Собирает SQL-статистику запроса (core.query_stats) и отдаёт её в Server-Timing и в лог.
+    Выражения потоковых ответов выполняются после отправки заголовков и сюда не попадают.
+    """
+    stats, token = begin_request(request.scope)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        end_request(token)
+    total_ms = (time.perf_counter() - started) * 1000
+    db_ms = stats.db_seconds * 1000
+
+    if settings.SERVER_TIMING_ENABLED:
+        response.headers.append(
+            "Server-Timing",
+            f'db;dur={db_ms:.2f};desc="{stats.statements} queries, {stats.rows} rows", app;dur={total_ms:.2f}',
+        )
+    logger.info(
+        "request",
+        extra={
+            "route": stats.route,
+            "method": request.method,
+            "status": response.status_code,
+            "duration_ms": round(total_ms, 2),
+            "db_statements": stats.statements,
+            "db_rows": stats.rows,
+            "db_ms": round(db_ms, 2),
+        },
+    )
+    return response
@@ -1,37 +1,113 @@
-from typing import Optional
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
 from uuid import UUID
 
-from sqlalchemy import Column, desc
-from sqlalchemy import select
+from fastapi import HTTPException, status
+from sqlalchemy import Select, literal, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import ColumnElement
 
-from models import Post
 
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+# Из какого JSON-типа допустимо восстановить значение колонки; прочие — строкой
+_JSON_TYPES: dict[type, type | tuple[type, ...]] = {int: int, float: (int, float), bool: bool}
+
+
+def _load_value(column: ColumnElement, value: Any) -> Any:
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if value is None or isinstance(value, python_type):
+        return value
+    # Курсор приходит от клиента: UUID(5) или fromisoformat([]) упали бы не ValueError
+    if not isinstance(value, _JSON_TYPES.get(python_type, str)):
+        raise ValueError(f"cursor value {value!r} does not fit {python_type.__name__}")
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_dump_value(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
 
-async def cursor_pagination(
-    session: AsyncSession,
-    model: type,
-    cursor: Optional[UUID] = None,
-    limit: int = 20,
-    cursor_column: Column = Post.created_at,
-    id_column: Column = Post.id
-):
-    # Добавляем загрузку отношений
-    query = select(model).options(
-        selectinload(Post.owner),  # ← Загружаем владельца
-        selectinload(Post.tags)  # ← Загружаем теги
-    ).order_by(desc(cursor_column), desc(id_column))
 
+def decode_cursor(cursor: str, columns: Sequence[ColumnElement]) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor arity mismatch")
+        return [_load_value(col, v) for col, v in zip(columns, values)]
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_select(
+    stmt: Select,
+    *,
+    sort_column: ColumnElement,
+    id_column: ColumnElement,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    descending: bool = True,
+) -> Select:
+    """stmt, ограниченный страницей после cursor (limit + 1 строка — признак следующей страницы)."""
+    key = (sort_column, id_column)
     if cursor:
-        cursor_obj = await session.get(model, cursor)
-        if cursor_obj:
-            cursor_value = getattr(cursor_obj, cursor_column.name)
-            cursor_id = getattr(cursor_obj, id_column.name)
+        values = decode_cursor(cursor, key)
+        bound = tuple_(*(literal(v, col.type) for col, v in zip(key, values)))
+        stmt = stmt.where(tuple_(*key) < bound if descending else tuple_(*key) > bound)
+
+    order_by = [c.desc() if descending else c.asc() for c in key]
+    return stmt.order_by(*order_by).limit(limit + 1)
 
-            query = query.where(
-                (cursor_column < cursor_value) |
-                ((cursor_column == cursor_value) & (id_column < cursor_id))
-            )
 
-    return (await session.execute(query.limit(limit))).scalars().all()
+async def keyset_paginate(
+    session: AsyncSession,
+    stmt: Select,
+    *,
+    sort_column: ColumnElement,
+    id_column: ColumnElement,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    descending: bool = True,
+) -> tuple[list, Optional[str]]:
+    """
+    Keyset-пагинация по (sort_column, id_column) за один запрос.
+    Курсор непрозрачный: в нём значения ключа последней строки, а не её id,
+    поэтому удалённая строка не сбрасывает выдачу в начало.
+    Загрузчики связей и фильтры задаёт вызывающий в stmt.
+    """
+    key = (sort_column, id_column)
+    stmt = keyset_select(
+        stmt,
+        sort_column=sort_column,
+        id_column=id_column,
+        cursor=cursor,
+        limit=limit,
+        descending=descending,
+    )
+    result = await session.execute(stmt)
+    if len(stmt.column_descriptions) == 1:
+        items = list(result.scalars().all())
+    else:
+        items = list(result.all())
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in key])
+    return items, next_cursor
@@ -0,0 +1,68 @@
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+
+from api.conditional import etag_matches, route_cache_control
+from api.middleware import wrote_recently
+from core.cache import response_cache
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@lru_cache(maxsize=None)
+def _adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def json_bytes(tp: Any, data: Any) -> bytes:
+    """Сериализация ORM-объектов/моделей сразу в JSON-байты одним проходом pydantic-core."""
+    adapter = _adapter(tp)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+def json_response(tp: Any, data: Any, response: Optional[Response] = None) -> Response:
+    """
+    Готовый JSON-ответ из json_bytes в обход сериализации FastAPI по response_model
+    (проверка + jsonable_encoder + json.dumps). response_model у маршрута остаётся для OpenAPI.
+    Заголовки, выставленные в response из зависимостей (ETag и т.п.), переносятся.
+    """
+    out = Response(content=json_bytes(tp, data), media_type=JSON_MEDIA_TYPE)
+    if response is not None:
+        out.raw_headers.extend(response.raw_headers)
+    return out
+
+
+def cache_key(request: Request) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+async def cached_json_response(
+    request: Request,
+    fill: Callable[[], Awaitable[tuple[str, bytes, Iterable[str]]]],
+    cache_control: str = "no-cache",
+) -> Response:
+    """
+    Отдаёт тело из response_cache (или заполняет его через fill).
+    fill возвращает (ETag, json-байты, теги инвалидации); ETag хранится
+    рядом с телом, так что и If-None-Match на тёплом ключе обходится без БД.
+    Недавно писавший клиент читает мимо кэша в обе стороны: закэшированное тело может быть
+    старше его записи, а его собственное чтение с основной БД — новее, чем видят остальные.
+    """
+    if wrote_recently(request):
+        etag, body, _ = await fill()
+    else:
+
+        async def fill_packed() -> tuple[bytes, Iterable[str]]:
+            etag, body, tags = await fill()
+            return etag.encode() + b"\n" + body, tags
+
+        packed = await response_cache.get_or_fill(cache_key(request), fill_packed)
+        raw_etag, body = packed.split(b"\n", 1)
+        etag = raw_etag.decode()
+    headers = {"ETag": etag, "Cache-Control": route_cache_control(request, cache_control)}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
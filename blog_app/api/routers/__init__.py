@@ -5,6 +5,7 @@ from .posts import router as posts_router
 from .tags import router as tags_router
 from .users import router as users_router
 from .task import router as task_router
+from .internal import router as internal_router
 from core.config import settings
 
 
@@ -14,3 +15,4 @@ router.include_router(posts_router)
 router.include_router(tags_router)
 router.include_router(users_router)
 router.include_router(task_router)
+router.include_router(internal_router)
@@ -5,8 +5,14 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.dependencies import get_db, get_current_active_user
-from core.security import get_password_hash, verify_password, create_jwt_token, decode_and_validate_token
+from api.dependencies import Principal, get_db, get_current_active_principal, get_current_active_user, load_principal
+from core.security import (
+    PasswordHasherBusy,
+    create_jwt_token,
+    decode_and_validate_token,
+    get_password_hash_async,
+    verify_password_async,
+)
 from core.config import settings
 from models.user import User
 from schemas.user import UserCreate, UserRead
@@ -15,6 +21,45 @@ from schemas.auth import TokenPair, RefreshRequest
 router = APIRouter(tags=["auth"], prefix="/auth")
 
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, try again later",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _issue_tokens(principal: Principal) -> TokenPair:
+    # Версия токенов нужна всегда — по ней refresh и access-токены отсекают отозванные сессии
+    refresh_token = create_jwt_token(
+        subject=principal.id,
+        token_type="refresh",
+        extra_claims={"ver": principal.token_version},
+    )
+    if settings.AUTH_CLAIMS_IN_TOKEN:
+        expires_in = settings.AUTH_CLAIMS_ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        access_token = create_jwt_token(
+            subject=principal.id,
+            token_type="access",
+            expires_delta=timedelta(seconds=expires_in),
+            extra_claims=principal.token_claims(),
+        )
+    else:
+        expires_in = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        # ver и здесь: без него get_current_principal не заметил бы отзыв до истечения токена
+        access_token = create_jwt_token(
+            subject=principal.id,
+            token_type="access",
+            extra_claims={"ver": principal.token_version},
+        )
+
+    return TokenPair(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        expires_in=expires_in,
+    )
+
+
 @router.post(
     "/register",
     response_model=UserRead,
@@ -25,14 +70,21 @@ async def register_user(
     session: AsyncSession = Depends(get_db)
 ):
     # Проверка уникальности username
-    exists = (await session.execute(select(User).where(User.username == payload.username))).scalar_one_or_none()
+    exists = (await session.execute(select(User.id).where(User.username == payload.username))).scalar_one_or_none()
     if exists:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
+    # Соединение возвращается в пул на время bcrypt, для INSERT сессия возьмёт новое
+    await session.close()
+
+    try:
+        hashed_password = await get_password_hash_async(payload.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
 
     user = User(
         username=payload.username,
         email=payload.email,
-        hashed_password=get_password_hash(payload.password),
+        hashed_password=hashed_password,
     )
     session.add(user)
     await session.commit()
@@ -46,27 +98,37 @@ async def login(
     session: AsyncSession = Depends(get_db)
 ):
     # OAuth2PasswordRequestForm: поля username, password
-    user = (await session.execute(select(User).where(User.username == form_data.username))).scalar_one_or_none()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    stmt = select(User).where(User.username == form_data.username)
+    user = (await session.execute(stmt)).scalar_one_or_none()
+    # Не держим соединение, пока ждём пул хеширования: при шторме логинов
+    # иначе заканчивается пул БД и встают все остальные запросы.
+    # close() не экспайрит user — атрибуты остаются доступны
+    await session.close()
+    try:
+        password_ok = bool(user) and await verify_password_async(form_data.password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    if not password_ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
 
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
 
-    access_token = create_jwt_token(subject=user.id, token_type="access")
-    refresh_token = create_jwt_token(subject=user.id, token_type="refresh")
-
-    return TokenPair(
-        access_token=access_token,
-        refresh_token=refresh_token,
-        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    return _issue_tokens(
+        Principal(
+            id=user.id,
+            username=user.username,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+            token_version=user.token_version,
+        )
     )
 
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 async def logout(
     response: Response,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
@@ -74,20 +136,26 @@ async def logout(
 
 
 @router.post("/refresh", response_model=TokenPair)
-async def refresh_token(req: RefreshRequest):
+async def refresh_token(
+    req: RefreshRequest,
+    session: AsyncSession = Depends(get_db),
+):
     try:
         payload = decode_and_validate_token(req.refresh_token, expected_type="refresh")
+        user_id = UUID(payload["sub"])
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
 
-    sub = payload["sub"]
-    access_token = create_jwt_token(subject=sub, token_type="access")
-    refresh_token = create_jwt_token(subject=sub, token_type="refresh")
-    return TokenPair(
-        access_token=access_token,
-        refresh_token=refresh_token,
-        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-    )
+    # Refresh всегда сверяется с БД: свежие флаги для claims и проверка отзыва
+    principal = await load_principal(session, user_id)
+    if not principal:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    if payload.get("ver", 0) != principal.token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+
+    return _issue_tokens(principal)
 
 
 @router.get("/me", response_model=UserRead)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+
+from api.dependencies import Principal, get_current_superuser_principal
+from core.db import pool_stats
+
+router = APIRouter(tags=["internal"], prefix="/internal")
+
+
+@router.get("/pool")
+async def get_pool_stats(
+    _: Principal = Depends(get_current_superuser_principal),
+):
+    """Состояние пулов соединений этого воркера."""
+    return pool_stats()
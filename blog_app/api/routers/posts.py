@@ -1,69 +1,237 @@
-from typing import Optional
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Literal, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from pydantic import ValidationError
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.dependencies import get_db, get_current_active_user
-from api.pagination import cursor_pagination
+from api.conditional import conditional_get, make_etag
+from api.dependencies import (
+    Principal,
+    get_current_active_principal,
+    get_current_superuser_principal,
+    get_read_db,
+    get_write_db,
+)
+from api.pagination import keyset_paginate, keyset_select
+from api.responses import cached_json_response, json_bytes, json_response
+from api.streaming import NDJSON_MEDIA_TYPE, iter_ndjson_lines, stream_format, stream_rows
+from core.config import settings
 from crud import post as crud_post
+from crud.post_import import import_posts
 from models.post import Post
-from models.user import User
-from schemas.post import PostCreate, PostUpdate, PostRead
+from schemas.common import CursorPage, UserBrief
+from schemas.user import UserRead
+from schemas.post import (
+    NormalizedPosts,
+    PostCreate,
+    PostFilter,
+    PostImport,
+    PostImportResult,
+    PostRef,
+    PostsFormat,
+    PostSummaryRef,
+    PostUpdate,
+    PostRead,
+    PostSearchHit,
+    PostSummary,
+    PostView,
+)
 
 router = APIRouter(tags=["posts"], prefix="/posts")
 
 
-def ensure_owner_or_superuser(current_user: User, post: Post):
+def ensure_owner_or_superuser(current_user: Principal, post: Post):
     if not (current_user.is_superuser or post.owner_id == current_user.id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
 
 
-@router.get("/", response_model=list[PostRead])
-async def list_posts(session: AsyncSession = Depends(get_db), ):
-    posts = await crud_post.get_posts_all(session)
-    return posts
+POST_VIEW_SCHEMAS = {
+    "full": PostRead,
+    "summary": PostSummary,
+}
 
+NORMALIZED_SCHEMAS = {
+    "full": NormalizedPosts[PostRef, UserRead],
+    "summary": NormalizedPosts[PostSummaryRef, UserBrief],
+}
 
-@router.get("/cursor", response_model=list[PostRead])
+
+def post_filter(
+    tag: list[UUID] = Query([], description="id тегов"),
+    tag_mode: Literal["any", "all"] = Query("any", description="любой из тегов или все сразу"),
+    owner_id: Optional[UUID] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    title_prefix: Optional[str] = Query(None, min_length=1, max_length=200),
+) -> PostFilter:
+    return PostFilter(
+        tag_ids=tag,
+        tag_mode=tag_mode,
+        owner_id=owner_id,
+        created_after=created_after,
+        created_before=created_before,
+        title_prefix=title_prefix,
+    )
+
+
+# Теги инвалидации response_cache, см. crud.post / crud.tags
+POSTS_LIST_CACHE_TAG = crud_post.POSTS_LIST_CACHE_TAG
+
+
+@router.get(
+    "/",
+    response_model=list[PostRead] | list[PostSummary] | NORMALIZED_SCHEMAS["full"] | NORMALIZED_SCHEMAS["summary"],
+)
 async def list_posts(
-    cursor: Optional[UUID] = None,
+    request: Request,
+    stream: bool = False,
+    view: PostView = "full",
+    posts_format: PostsFormat = Query("nested", alias="format"),
+    filters: PostFilter = Depends(post_filter),
+    session: AsyncSession = Depends(get_read_db),
+):
+    # Потоковая выдача всегда nested: normalized требует всей выборки до ответа
+    fmt = stream_format(request, stream)
+    if fmt:
+        stmt = crud_post.posts_all_stmt(view, filters)
+        return stream_rows(stmt, POST_VIEW_SCHEMAS[view], fmt, bind=session.bind)
+
+    async def fill():
+        # Полный список не агрегируется ради ETag: версия — общий счётчик изменений постов
+        version = await crud_post.get_posts_list_version(session)
+        if posts_format == "normalized":
+            stmt = crud_post.apply_filter(crud_post.normalized_stmt(view), filters)
+            rows = (await session.execute(stmt.order_by(Post.created_at.desc(), Post.id.desc()))).all()
+            body = json_bytes(NORMALIZED_SCHEMAS[view], await crud_post.load_normalized(session, rows, view))
+        else:
+            posts = await crud_post.get_posts_all(session, view, filters)
+            body = json_bytes(list[POST_VIEW_SCHEMAS[view]], posts)
+        return make_etag("posts", str(request.query_params), version), body, [POSTS_LIST_CACHE_TAG]
+
+    return await cached_json_response(request, fill)
+
+
+CURSOR_SORT_COLUMNS = {
+    "created_at": Post.created_at,
+    "title": Post.title,
+}
+
+
+@router.get(
+    "/cursor",
+    response_model=CursorPage[PostRead]
+    | CursorPage[PostSummary]
+    | NORMALIZED_SCHEMAS["full"]
+    | NORMALIZED_SCHEMAS["summary"],
+)
+async def list_posts_cursor(
+    request: Request,
+    cursor: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
-    session: AsyncSession = Depends(get_db),
+    sort: Literal["created_at", "title"] = "created_at",
+    order: Literal["desc", "asc"] = "desc",
+    view: PostView = "full",
+    posts_format: PostsFormat = Query("nested", alias="format"),
+    filters: PostFilter = Depends(post_filter),
+    session: AsyncSession = Depends(get_read_db),
 ):
-    posts = await cursor_pagination(
-        session=session,
-        model=Post,
+    base = crud_post.apply_filter(select(Post), filters)
+    page = dict(
+        sort_column=CURSOR_SORT_COLUMNS[sort],
+        id_column=Post.id,
+        cursor=cursor,
+        limit=limit,
+        descending=order == "desc",
+    )
+
+    async def fill():
+        version = await crud_post.get_posts_version(session, keyset_select(base, **page))
+        if posts_format == "normalized":
+            stmt = crud_post.apply_filter(crud_post.normalized_stmt(view), filters)
+            rows, next_cursor = await keyset_paginate(session, stmt, **page)
+            data = await crud_post.load_normalized(session, rows, view)
+            body = json_bytes(NORMALIZED_SCHEMAS[view], {**data, "next_cursor": next_cursor})
+        else:
+            posts, next_cursor = await keyset_paginate(session, crud_post.with_view(base, view), **page)
+            page_type = CursorPage[POST_VIEW_SCHEMAS[view]]
+            body = json_bytes(page_type, {"items": posts, "next_cursor": next_cursor})
+        etag = make_etag("posts/cursor", str(request.query_params), version)
+        return etag, body, [POSTS_LIST_CACHE_TAG]
+
+    return await cached_json_response(request, fill)
+
+
+@router.get("/search", response_model=CursorPage[PostSearchHit])
+async def search_posts(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_db),
+):
+    # Сортировка по релевантности, при равном rank — по id
+    page = dict(
+        sort_column=crud_post.search_rank(q),
+        id_column=Post.id,
         cursor=cursor,
         limit=limit,
-        cursor_column=Post.created_at,
-        id_column=Post.id
+        descending=True,
     )
-    return posts
+
+    async def fill():
+        version = await crud_post.get_posts_version(session, keyset_select(crud_post.search_match(q), **page))
+        hits, next_cursor = await keyset_paginate(session, crud_post.search_posts_stmt(q), **page)
+        body = json_bytes(CursorPage[PostSearchHit], {"items": hits, "next_cursor": next_cursor})
+        etag = make_etag("posts/search", str(request.query_params), version)
+        return etag, body, [POSTS_LIST_CACHE_TAG]
+
+    return await cached_json_response(request, fill)
 
 
-@router.get("/me", response_model=list[PostRead])
+@router.get("/me", response_model=list[PostRead] | list[PostSummary])
 async def list_my_posts(
-    session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    response: Response,
+    view: PostView = "full",
+    session: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_principal)
 ):
-    posts = await crud_post.get_posts_me(session=session, user_id=current_user.id)
-    return posts
+    version = await crud_post.get_posts_version(session, select(Post).where(Post.owner_id == current_user.id))
+    etag = make_etag("posts/me", current_user.id, view, version)
+    not_modified = conditional_get(request, response, etag, cache_control="private, no-cache")
+    if not_modified:
+        return not_modified
+
+    posts = await crud_post.get_posts_me(session=session, user_id=current_user.id, view=view)
+    return json_response(list[POST_VIEW_SCHEMAS[view]], posts, response)
 
 
 @router.get("/{post_id}", response_model=PostRead)
-async def get_post(post_id: UUID, session: AsyncSession = Depends(get_db)):
-    post = await crud_post.get_post_with_rels(session, post_id)
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    return post
+async def get_post(
+    post_id: UUID,
+    request: Request,
+    session: AsyncSession = Depends(get_read_db),
+):
+    async def fill():
+        version = await crud_post.get_posts_version(session, select(Post).where(Post.id == post_id))
+        post = await crud_post.get_post_with_rels(session, post_id)
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        tags = crud_post.post_cache_tags(post)
+        return make_etag("post", post_id, version), json_bytes(PostRead, post), tags
+
+    return await cached_json_response(request, fill)
 
 
 @router.post("/", response_model=PostRead, status_code=status.HTTP_201_CREATED)
 async def create_post(
     payload: PostCreate,
-    session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_write_db),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
     post = await crud_post.create_post(
         session=session,
@@ -75,24 +243,61 @@ async def create_post(
     return post
 
 
+def _import_error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in e.errors())
+
+
+async def _import_rows(request: Request) -> AsyncIterator[tuple[Optional[PostImport], Optional[str]]]:
+    # NDJSON читается построчно по мере прихода тела; JSON-массив — целиком
+    if NDJSON_MEDIA_TYPE in request.headers.get("content-type", ""):
+        async for line in iter_ndjson_lines(request):
+            try:
+                yield PostImport.model_validate_json(line), None
+            except ValidationError as e:
+                yield None, _import_error(e)
+        return
+
+    try:
+        data: Any = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array")
+    for item in data:
+        try:
+            yield PostImport.model_validate(item), None
+        except ValidationError as e:
+            yield None, _import_error(e)
+
+
+@router.post("/bulk", response_model=PostImportResult)
+async def bulk_import_posts(
+    request: Request,
+    session: AsyncSession = Depends(get_write_db),
+    current_user: Principal = Depends(get_current_superuser_principal),
+):
+    """Импорт JSON-массива или NDJSON (Content-Type: application/x-ndjson) объектов PostImport."""
+    return await import_posts(
+        session,
+        _import_rows(request),
+        owner_id=current_user.id,
+        chunk_size=settings.BULK_IMPORT_CHUNK_SIZE,
+    )
+
+
 @router.patch("/{post_id}", response_model=PostRead)
 async def update_post(
     post_id: UUID,
     payload: PostUpdate,
-    session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_write_db),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
-    # Берём пост без связей для проверки прав
-    post = await crud_post.get_post(session, post_id)
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-
-    ensure_owner_or_superuser(current_user, post)
-
-    # Обновляем и возвращаем с отношениями
+    # Права проверяются в самом UPDATE: 404/403 — если ни одна строка не обновилась
     return await crud_post.update_post(
         session,
-        post,
+        post_id,
+        user_id=current_user.id,
+        is_superuser=current_user.is_superuser,
         title=payload.title,
         content=payload.content,
         tag_ids=payload.tag_ids,
@@ -102,8 +307,8 @@ async def update_post(
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_post(
     post_id: UUID,
-    session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_write_db),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
     post = await crud_post.get_post(session, post_id)
     if not post:
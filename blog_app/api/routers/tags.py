@@ -1,39 +1,113 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.dependencies import get_db, get_current_active_user, get_current_superuser
+from api.conditional import conditional_get, make_etag
+from api.dependencies import get_read_db, get_write_db, get_current_active_principal, get_current_superuser_principal
+from api.pagination import keyset_paginate
+from api.responses import json_response
+from api.streaming import stream_format, stream_rows
 from crud import tags as crud_tag
-from schemas.tag import TagCreate, TagRead, TagResolveRequest, TagIDs, TagWithPosts, TagUpdate
+from models import Post
+from schemas.common import CursorPage, PostBrief, TagBrief
+from schemas.tag import TagCreate, TagRead, TagResolveRequest, TagIDs, TagWithCount, TagWithPosts, TagUpdate
 
 router = APIRouter(tags=["tags"], prefix="/tags")
 
+# Сколько постов встраивать в ответ GET /tags/{tag_id}
+TAG_DETAIL_POSTS_LIMIT = 20
 
-@router.get("/", response_model=list[TagRead])
-async def list_tags(session: AsyncSession = Depends(get_db)):
+
+async def _tag_posts_page(session: AsyncSession, tag_id: UUID, cursor: Optional[str], limit: int):
+    return await keyset_paginate(
+        session,
+        crud_tag.tag_posts_stmt(tag_id),
+        sort_column=Post.created_at,
+        id_column=Post.id,
+        cursor=cursor,
+        limit=limit,
+    )
+
+
+@router.get("/", response_model=list[TagWithCount])
+async def list_tags(
+    request: Request,
+    response: Response,
+    stream: bool = False,
+    session: AsyncSession = Depends(get_read_db),
+):
+    fmt = stream_format(request, stream)
+    if fmt:
+        return stream_rows(crud_tag.tags_list_stmt(), TagWithCount, fmt, bind=session.bind)
+
+    version = await crud_tag.get_tags_version(session)
+    not_modified = conditional_get(request, response, make_etag("tags", version))
+    if not_modified:
+        return not_modified
     tags = await crud_tag.get_tags(session)
-    return tags
+    return json_response(list[TagWithCount], tags, response)
+
+
+@router.get("/suggest", response_model=list[TagBrief])
+async def suggest_tags(
+    prefix: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(get_read_db),
+):
+    return json_response(list[TagBrief], await crud_tag.suggest_tags(session, prefix, limit))
 
 
 @router.get("/{tag_id}", response_model=TagWithPosts)
 async def get_tag(
     tag_id: UUID,
-    session: AsyncSession = Depends(get_db),
-    _: None = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_db),
+    _: None = Depends(get_current_active_principal),
 ):
-    tag = await crud_tag.get_tag(session=session, tag_id=tag_id)
+    version = await crud_tag.get_tag_version(session, tag_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    etag = make_etag("tag", tag_id, version)
+    not_modified = conditional_get(request, response, etag, cache_control="private, no-cache")
+    if not_modified:
+        return not_modified
+
+    tag = await crud_tag.get_tag(tag_id, session)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
-    return tag
+    posts, next_cursor = await _tag_posts_page(session, tag_id, None, TAG_DETAIL_POSTS_LIMIT)
+    return TagWithPosts(
+        id=tag.id,
+        name=tag.name,
+        created_at=tag.created_at,
+        posts=[PostBrief.model_validate(p) for p in posts],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/{tag_id}/posts", response_model=CursorPage[PostBrief])
+async def list_tag_posts(
+    tag_id: UUID,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_db),
+    _: None = Depends(get_current_active_principal),
+):
+    posts, next_cursor = await _tag_posts_page(session, tag_id, cursor, limit)
+    # Пустая страница — либо тег без постов, либо тега нет: только тогда лишний запрос
+    if not posts and await crud_tag.get_tag_version(session, tag_id) is None:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    return json_response(CursorPage[PostBrief], {"items": posts, "next_cursor": next_cursor})
 
 
 @router.post("/", response_model=TagRead, status_code=status.HTTP_201_CREATED)
 async def create_tag(
     payload: TagCreate,
-    session: AsyncSession = Depends(get_db),
-    _: None = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_write_db),
+    _: None = Depends(get_current_active_principal),
 ):
     tag = await crud_tag.create_tag(session=session, name=payload.name)
     return tag
@@ -43,8 +117,8 @@ async def create_tag(
 async def update_tag(
     tag_id: UUID,
     payload: TagUpdate,
-    session: AsyncSession = Depends(get_db),
-    _: None = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_write_db),
+    _: None = Depends(get_current_superuser_principal),
 ):
     tag = await crud_tag.get_tag(tag_id, session)
     if not tag:
@@ -60,8 +134,8 @@ async def update_tag(
 @router.delete("/{tag_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_tag(
     tag_id: UUID,
-    session: AsyncSession = Depends(get_db),
-    _: None = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_write_db),
+    _: None = Depends(get_current_superuser_principal),
 ):
     tag = await crud_tag.get_tag(tag_id, session)
     if not tag:
@@ -72,8 +146,8 @@ async def delete_tag(
 @router.post("/resolve", response_model=TagIDs)
 async def resolve_tags(
     payload: TagResolveRequest,
-    session: AsyncSession = Depends(get_db),
-    _user=Depends(get_current_active_user),  # только авторизованным
+    session: AsyncSession = Depends(get_write_db),
+    _user=Depends(get_current_active_principal),  # только авторизованным
 ):
     ids: List[UUID] = await crud_tag.resolve_tag_ids(session, payload.names)
     return TagIDs(ids=ids)
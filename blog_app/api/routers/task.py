@@ -1,24 +1,51 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.dependencies import get_db, get_current_active_user
+from api.conditional import conditional_get, make_etag
+from api.dependencies import Principal, get_read_db, get_write_db, get_current_active_principal
+from api.responses import json_response
+from api.streaming import stream_format, stream_rows
 from crud import task as crud_task
-from models import User
 from schemas.task import TaskCreate, TaskRead
 
 router = APIRouter(tags=["tasks"], prefix="/tasks")
 
 
 @router.get("/", response_model=list[TaskRead])
-async def list_tasks(session: AsyncSession = Depends(get_db), ):
+async def list_tasks(
+    request: Request,
+    response: Response,
+    stream: bool = False,
+    session: AsyncSession = Depends(get_read_db),
+):
+    fmt = stream_format(request, stream)
+    if fmt:
+        return stream_rows(crud_task.tasks_list_stmt(), TaskRead, fmt, bind=session.bind)
+
+    version = await crud_task.get_tasks_version(session)
+    not_modified = conditional_get(request, response, make_etag("tasks", version))
+    if not_modified:
+        return not_modified
     tasks = await crud_task.get_tasks(session)
-    return tasks
+    return json_response(list[TaskRead], tasks, response)
 
 
 @router.get("/{task_id}", response_model=TaskRead)
-async def get_task(task_id: UUID, session: AsyncSession = Depends(get_db)):
+async def get_task(
+    task_id: UUID,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_db),
+):
+    version = await crud_task.get_task_version(session, task_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    not_modified = conditional_get(request, response, make_etag("task", task_id, version))
+    if not_modified:
+        return not_modified
+
     task = await crud_task.get_task(task_id, session)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -28,8 +55,8 @@ async def get_task(task_id: UUID, session: AsyncSession = Depends(get_db)):
 @router.post("/", response_model=TaskRead, status_code=status.HTTP_201_CREATED)
 async def create_task(
     payload: TaskCreate,
-    session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_write_db),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
     task = await crud_task.create_task(
         session=session,
@@ -3,41 +3,67 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.dependencies import get_db, get_current_superuser
+from api.dependencies import (
+    Principal,
+    get_db,
+    get_write_db,
+    get_current_superuser_principal,
+    invalidate_principal,
+    revoke_user_tokens,
+)
+from api.responses import json_response
+from core.cache import response_cache
+from crud.post import POSTS_LIST_CACHE_TAG
 from models.user import User
 from schemas.user import UserRead
 
 router = APIRouter(tags=["users"], prefix="/users")
 
+
 @router.get("/", response_model=list[UserRead])
 async def list_users(
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
     session: AsyncSession = Depends(get_db),
-    _: User = Depends(get_current_superuser),
+    _: Principal = Depends(get_current_superuser_principal),
 ):
     stmt = select(User).limit(limit).offset(offset).order_by(User.created_at.desc())
     users = (await session.execute(stmt)).scalars().all()
-    return users
+    return json_response(list[UserRead], users)
+
 
 @router.get("/{user_id}", response_model=UserRead)
 async def get_user(
     user_id: UUID,
     session: AsyncSession = Depends(get_db),
-    _: User = Depends(get_current_superuser),
+    _: Principal = Depends(get_current_superuser_principal),
 ):
     user = (await session.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: UUID,
-    session: AsyncSession = Depends(get_db),
-    _: User = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_write_db),
+    _: Principal = Depends(get_current_superuser_principal),
 ):
     res = await session.execute(delete(User).where(User.id == user_id))
     if res.rowcount == 0:
         raise HTTPException(status_code=404, detail="User not found")
-    await session.commit()
\ No newline at end of file
+    await session.commit()
+    invalidate_principal(user_id)
+    # посты пользователя удалены каскадом
+    await response_cache.invalidate(POSTS_LIST_CACHE_TAG, f"user:{user_id}")
+
+
+@router.post("/{user_id}/revoke-tokens", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_tokens(
+    user_id: UUID,
+    session: AsyncSession = Depends(get_write_db),
+    _: Principal = Depends(get_current_superuser_principal),
+):
+    if not await revoke_user_tokens(session, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
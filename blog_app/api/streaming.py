@@ -0,0 +1,88 @@
+from typing import AsyncIterator, Literal, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+from core.db import AsyncSessionLocal, engine
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+StreamFormat = Literal["ndjson", "json"]
+
+
+def stream_format(request: Request, stream: bool) -> Optional[StreamFormat]:
+    """NDJSON по заголовку Accept, JSON-массив по флагу ?stream=true, иначе обычный ответ."""
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return "ndjson"
+    if stream:
+        return "json"
+    return None
+
+
+async def _iter_rows(
+    stmt: Select,
+    schema: type[BaseModel],
+    fmt: StreamFormat,
+    bind: Optional[AsyncEngine],
+) -> AsyncIterator[bytes]:
+    chunk_size = settings.STREAM_CHUNK_SIZE
+    separator = b"\n" if fmt == "ndjson" else b","
+    first = True
+    if fmt == "json":
+        yield b"["
+
+    # Своя сессия: сессия из зависимости закрывается до начала отправки тела
+    # bind — движок сессии обработчика (реплика или основная БД)
+    async with AsyncSessionLocal(bind=bind or engine) as session:
+        result = await session.stream(stmt.execution_options(yield_per=chunk_size))
+        columns = stmt.column_descriptions
+        if len(columns) == 1:
+            result = result.scalars()
+        # select(Post) и т.п.: в партициях ORM-объекты, а не значения колонок
+        entities = len(columns) == 1 and columns[0]["type"] is columns[0]["entity"]
+        async for partition in result.partitions():
+            rows = [schema.model_validate(obj).model_dump_json().encode() for obj in partition]
+            if not rows:
+                continue
+            chunk = separator.join(rows)
+            if fmt == "ndjson":
+                chunk += b"\n"
+            elif not first:
+                chunk = b"," + chunk
+            first = False
+            yield chunk
+            # Строки партиции больше не нужны — не держим их в identity map.
+            # Поштучно: expunge_all() подменяет identity map, в которую ещё грузит yield_per
+            if entities:
+                for obj in partition:
+                    session.expunge(obj)
+
+    if fmt == "json":
+        yield b"]"
+
+
+async def iter_ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """Непустые строки NDJSON-тела запроса по мере чтения, без буферизации всего тела."""
+    tail = b""
+    async for chunk in request.stream():
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if tail.strip():
+        yield tail
+
+
+def stream_rows(
+    stmt: Select,
+    schema: type[BaseModel],
+    fmt: StreamFormat,
+    bind: Optional[AsyncEngine] = None,
+) -> StreamingResponse:
+    media_type = NDJSON_MEDIA_TYPE if fmt == "ndjson" else "application/json"
+    return StreamingResponse(_iter_rows(stmt, schema, fmt, bind), media_type=media_type)
@@ -0,0 +1,243 @@
+import asyncio
+import bisect
+import time
+from collections import OrderedDict, defaultdict
+from typing import Awaitable, Callable, Generic, Hashable, Iterable, Optional, Protocol, TypeVar
+
+from core.config import settings
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Ограниченный LRU-кэш с TTL на запись. Рассчитан на один event loop (без блокировок).
+    on_evict вызывается для каждого ключа, покинувшего кэш (LRU, TTL, invalidate, clear).
+    """
+
+    def __init__(self, maxsize: int, ttl: float, on_evict: Optional[Callable[[K], None]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._on_evict = on_evict
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def _evicted(self, key: K) -> None:
+        if self._on_evict is not None:
+            self._on_evict(key)
+
+    def get(self, key: K) -> Optional[V]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self._evicted(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._evicted(evicted)
+
+    def invalidate(self, key: K) -> None:
+        if self._data.pop(key, None) is not None:
+            self._evicted(key)
+
+    def clear(self) -> None:
+        keys = list(self._data)
+        self._data.clear()
+        for key in keys:
+            self._evicted(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class PrefixIndex(Generic[V]):
+    """
+    Отсортированный массив строковых ключей + словарь key -> value.
+    Поиск по префиксу — bisect и проход по соседям, O(log n + limit).
+    Порядок ключей — по кодовым точкам, как COLLATE "C" в Postgres.
+    """
+
+    def __init__(self):
+        self._keys: list[str] = []
+        self._values: dict[str, V] = {}
+        self.loaded_at: Optional[float] = None
+
+    def load(self, items: Iterable[tuple[str, V]]) -> None:
+        values = dict(items)
+        self._keys = sorted(values)
+        self._values = values
+        self.loaded_at = time.monotonic()
+
+    def is_fresh(self, max_age: float) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < max_age
+
+    def get(self, key: str) -> Optional[V]:
+        return self._values.get(key)
+
+    def add(self, key: str, value: V) -> None:
+        if key not in self._values:
+            bisect.insort(self._keys, key)
+        self._values[key] = value
+
+    def discard(self, key: str) -> None:
+        if self._values.pop(key, None) is None:
+            return
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def search(self, prefix: str, limit: int) -> list[tuple[str, V]]:
+        result = []
+        i = bisect.bisect_left(self._keys, prefix)
+        while i < len(self._keys) and len(result) < limit:
+            key = self._keys[i]
+            if not key.startswith(prefix):
+                break
+            result.append((key, self._values[key]))
+            i += 1
+        return result
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class CacheBackend(Protocol):
+    """Хранилище байтов с инвалидацией по тегам. Реализация для Redis: SET key + SADD tag key."""
+
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str]) -> None: ...
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None: ...
+
+
+class MemoryCacheBackend:
+    """In-process LRU+TTL бэкенд поверх TTLCache."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._data: TTLCache[str, bytes] = TTLCache(maxsize=maxsize, ttl=ttl, on_evict=self._forget)
+        # Индекс тегов держит только живые ключи: ключ, покинувший _data, удаляется из всех своих тегов
+        self._keys_by_tag: dict[str, set[str]] = defaultdict(set)
+        self._tags_by_key: dict[str, tuple[str, ...]] = {}
+
+    def _forget(self, key: str) -> None:
+        for tag in self._tags_by_key.pop(key, ()):
+            keys = self._keys_by_tag.get(tag)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_tag[tag]
+
+    @property
+    def hits(self) -> int:
+        return self._data.hits
+
+    @property
+    def misses(self) -> int:
+        return self._data.misses
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._data.get(key)
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str]) -> None:
+        self._forget(key)
+        self._data.set(key, value)
+        if key not in self._data:
+            return
+        tags = tuple(tags)
+        self._tags_by_key[key] = tags
+        for tag in tags:
+            self._keys_by_tag[tag].add(key)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            for key in self._keys_by_tag.pop(tag, ()):
+                self._data.invalidate(key)
+
+    def stats(self) -> dict[str, int]:
+        return self._data.stats()
+
+
+class ResponseCache:
+    """
+    Read-through кэш сериализованных ответов.
+    Холодный ключ заполняется одним вызовом fill на процесс (остальные ждут его),
+    а заполнение, начатое до инвалидации, в кэш не попадает.
+    """
+
+    def __init__(self, backend: CacheBackend, enabled: bool = True, settle_seconds: float = 0.0):
+        self.backend = backend
+        self.enabled = enabled
+        # Сразу после инвалидации заполнение может прочитать реплику, ещё не догнавшую запись:
+        # такие ответы отдаём, но не кэшируем
+        self.settle_seconds = settle_seconds
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._generation = 0
+        self._invalidated_at = float("-inf")
+
+    async def get_or_fill(
+        self,
+        key: str,
+        fill: Callable[[], Awaitable[tuple[bytes, Iterable[str]]]],
+    ) -> bytes:
+        if not self.enabled:
+            value, _ = await fill()
+            return value
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            return cached
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                cached = await self.backend.get(key)
+                if cached is not None:
+                    return cached
+                generation = self._generation
+                value, tags = await fill()
+                settled = time.monotonic() - self._invalidated_at >= self.settle_seconds
+                if generation == self._generation and settled:
+                    await self.backend.set(key, value, tags)
+                return value
+        finally:
+            if not lock.locked():
+                self._locks.pop(key, None)
+
+    async def invalidate(self, *tags: str) -> None:
+        self._generation += 1
+        self._invalidated_at = time.monotonic()
+        await self.backend.invalidate_tags(tags)
+
+
+response_cache = ResponseCache(
+    MemoryCacheBackend(
+        maxsize=settings.RESPONSE_CACHE_MAXSIZE,
+        ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    ),
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+    settle_seconds=settings.READ_YOUR_WRITES_SECONDS if settings.DATABASE_REPLICA_URLS else 0.0,
+)
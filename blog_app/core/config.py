@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List
+from typing import List, Literal, Optional
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -15,18 +15,81 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 120
     REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    # Флаги пользователя в access-токене: авторизация без похода в БД
+    AUTH_CLAIMS_IN_TOKEN: bool = False
+    AUTH_CLAIMS_ACCESS_TOKEN_EXPIRE_MINUTES: int = 5
+
+    # Password hashing (bcrypt в отдельном пуле потоков)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+
+    # Кэш principal'ов (id -> флаги) для авторизации
+    AUTH_CACHE_MAXSIZE: int = 10_000
+    AUTH_CACHE_TTL_SECONDS: float = 30.0
 
     # DB
     DATABASE_ASYNC_URL: str
+    # Реплики для чтения (через запятую); пусто — всё читается с основной БД
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_STRATEGY: Literal["round_robin", "least_busy"] = "round_robin"
+    # Сколько секунд после записи клиент читает с основной БД (отставание реплик)
+    READ_YOUR_WRITES_SECONDS: float = 5.0
     ## DATABASE_SYNC_URL: str
     DB_ECHO: bool = False
+    # Пул соединений — на каждый воркер uvicorn отдельно
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Пересоздавать соединения старше N секунд (-1 — никогда, как было до настройки пула)
+    DB_POOL_RECYCLE: int = -1
+    # Проверка соединения SELECT 1 при каждой выдаче из пула; при False обрывы ловит только DB_POOL_RECYCLE
+    DB_POOL_PRE_PING: bool = True
+    # Кэш подготовленных выражений asyncpg на соединение (0 — выключен, нужно за pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Предупреждение в лог, если выдача соединения заняла дольше
+    DB_POOL_WAIT_WARN_MS: float = 100.0
+    # Выражения дольше порога пишутся в лог вместе с маршрутом
+    DB_SLOW_QUERY_MS: float = 200.0
+    # Заголовок Server-Timing с числом SQL-выражений и временем в БД
+    SERVER_TIMING_ENABLED: bool = True
+    # Сколько строк за раз читать из серверного курсора при потоковой выдаче
+    STREAM_CHUNK_SIZE: int = 500
+
+    # HTTP-кэширование: Cache-Control по шаблону пути, например
+    # {"/api/v1/posts/{post_id}": "public, max-age=30"}
+    CACHE_CONTROL_ROUTES: dict[str, str] = {}
+
+    # POST /posts/bulk: сколько строк писать одним COPY и одной транзакцией
+    BULK_IMPORT_CHUNK_SIZE: int = 5000
+
+    # Кэш ответов публичных GET /posts/*
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAXSIZE: int = 1000
+    RESPONSE_CACHE_TTL_SECONDS: float = 60.0
+
+    # Индекс имён тегов в памяти (GET /tags/suggest): через сколько перечитывать из БД,
+    # чтобы подхватить правки других воркеров
+    TAG_INDEX_REFRESH_SECONDS: float = 300.0
+    # Кэш name -> id для resolve_tag_ids. TTL ограничивает, сколько воркер может не видеть
+    # переименование или удаление тега на другом воркере (свои правки сбрасывают ключ сразу)
+    TAG_ID_CACHE_MAXSIZE: int = 10_000
+    TAG_ID_CACHE_TTL_SECONDS: float = 60.0
+
+    # Метрики Prometheus (GET /metrics). Для нескольких воркеров uvicorn — общий каталог,
+    # куда каждый воркер раз в METRICS_FLUSH_SECONDS сбрасывает свои значения
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_FLUSH_SECONDS: float = 5.0
+    METRICS_STALE_SECONDS: float = 30.0
+    # Файлы воркеров, молчащих дольше, сворачиваются в общий архив (только счётчики и гистограммы)
+    METRICS_DEAD_SECONDS: float = 300.0
 
     # CORS
     CORS_ORIGINS: List[str] = []
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
-    @field_validator("CORS_ORIGINS", mode="before")
+    @field_validator("CORS_ORIGINS", "DATABASE_REPLICA_URLS", mode="before")
     @classmethod
     def split_origins(cls, v):
         if isinstance(v, str):
@@ -1,17 +1,107 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import itertools
+import logging
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
 from core.config import settings
+from core.query_stats import instrument_engine
 
-engine = create_async_engine(
-    settings.DATABASE_ASYNC_URL,
-    echo=settings.DB_ECHO,
-    future=True,
-    pool_pre_ping=True,
-)
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool со счётчиками выдачи соединений: сколько ждали, сколько раз не дождались.
+    Время выдачи включает ожидание свободного соединения, pre-ping и открытие нового.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            logger.warning("db pool exhausted: %s", self.status())
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+            if wait * 1000 >= settings.DB_POOL_WAIT_WARN_MS:
+                logger.warning("db pool checkout took %.1f ms: %s", wait * 1000, self.status())
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+def make_engine(url: str):
+    async_engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        future=True,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    )
+    instrument_engine(async_engine)
+    return async_engine
+
+
+engine = make_engine(settings.DATABASE_ASYNC_URL)
+replica_engines = [make_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+_replica_cycle = itertools.cycle(replica_engines)
 
 AsyncSessionLocal = async_sessionmaker(
     engine, expire_on_commit=False, autoflush=False, autocommit=False, class_=AsyncSession
 )
 
+
+def read_engine() -> AsyncEngine:
+    """Реплика для очередного чтения; без реплик — основная БД."""
+    if not replica_engines:
+        return engine
+    if settings.DB_REPLICA_STRATEGY == "least_busy":
+        return min(replica_engines, key=lambda e: e.pool.checkedout())
+    return next(_replica_cycle)
+
+
+def pool_stats() -> dict:
+    stats = {"primary": engine.pool.stats()}
+    for i, replica in enumerate(replica_engines):
+        stats[f"replica_{i}"] = replica.pool.stats()
+    return stats
+
+
 async def get_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_read_session(primary: bool = False) -> AsyncSession:
+    async with AsyncSessionLocal(bind=engine if primary else read_engine()) as session:
+        yield session
@@ -0,0 +1,278 @@
+import asyncio
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+from contextlib import suppress
+from typing import Any, Callable, Optional, Sequence
+from uuid import uuid4
+
+from core.config import settings
+
+LabelKey = tuple[tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _key(labels: dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, registry: Optional["Registry"] = None):
+        self.name = name
+        self.help = help
+        self._values: dict[LabelKey, Any] = {}
+        (registry or REGISTRY).register(self)
+
+    def samples(self) -> dict[LabelKey, Any]:
+        return self._values
+
+    @staticmethod
+    def merge(a: Any, b: Any) -> Any:
+        return a + b
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels) -> None:
+        # Для счётчиков, которые ведёт кто-то другой (пул, кэши) — копируем текущее значение
+        self._values[_key(labels)] = value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self._values[_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, **kwargs)
+
+    def observe(self, value: float, **labels) -> None:
+        key = _key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # счётчики по корзинам (не накопительные) + последняя для +Inf, сумма, количество
+            state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+        i = next((i for i, b in enumerate(self.buckets) if value <= b), len(self.buckets))
+        state["counts"][i] += 1
+        state["sum"] += value
+        state["count"] += 1
+
+    @staticmethod
+    def merge(a: dict, b: dict) -> dict:
+        return {
+            "counts": [x + y for x, y in zip(a["counts"], b["counts"])],
+            "sum": a["sum"] + b["sum"],
+            "count": a["count"] + b["count"],
+        }
+
+
+def _copy(value: Any) -> Any:
+    # Состояние гистограммы меняется в event loop — в снимок идёт копия
+    return {**value, "counts": list(value["counts"])} if isinstance(value, dict) else value
+
+
+def _read(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path: str, snapshot: dict) -> None:
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+
+def _merge(merged: dict[str, dict], snapshot: dict, gauges: bool = True) -> None:
+    for name, data in snapshot.items():
+        if not gauges and data["type"] == "gauge":
+            continue
+        target = merged.setdefault(name, {**data, "samples": {}})
+        merge = Histogram.merge if data["type"] == "histogram" else Metric.merge
+        for labels, value in data["samples"]:
+            key = tuple(map(tuple, labels))
+            prev = target["samples"].get(key)
+            target["samples"][key] = value if prev is None else merge(prev, value)
+
+
+def _as_snapshot(merged: dict[str, dict]) -> dict:
+    return {name: {**data, "samples": [[key, value] for key, value in data["samples"].items()]}
+            for name, data in merged.items()}
+
+
+ARCHIVE_FILE = "metrics-archive.json"
+
+
+class Registry:
+    """
+    Метрики процесса в текстовом формате Prometheus.
+    С METRICS_MULTIPROC_DIR каждый запуск воркера сбрасывает снимок в свой файл,
+    а /metrics любого воркера суммирует все файлы. Gauge умерших воркеров не учитываются
+    (файл старше METRICS_STALE_SECONDS), а их счётчики и гистограммы через METRICS_DEAD_SECONDS
+    переносятся в общий архивный файл — суммы не падают, каталог не растёт.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.metrics: dict[str, Metric] = {}
+        self.collectors: list[Callable[[], None]] = []
+        self._pid: Optional[int] = None
+        self._file = ""
+
+    def register(self, metric: Metric) -> None:
+        self.metrics[metric.name] = metric
+
+    def collector(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Функция, обновляющая метрики из внешних источников перед каждым снимком."""
+        self.collectors.append(fn)
+        return fn
+
+    def snapshot(self) -> dict:
+        for fn in self.collectors:
+            fn()
+        return {
+            name: {
+                "type": m.kind,
+                "help": m.help,
+                "buckets": getattr(m, "buckets", None),
+                "samples": [[list(map(list, key)), _copy(value)] for key, value in m.samples().items()],
+            }
+            for name, m in self.metrics.items()
+        }
+
+    def _path(self) -> str:
+        # Файл на запуск, а не на PID: воркер с переиспользованным PID не затрёт счётчики умершего
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._file = os.path.join(self.directory, f"metrics-{self._pid}-{uuid4().hex[:8]}.json")
+        return self._file
+
+    def write_snapshot(self, snapshot: Optional[dict] = None) -> None:
+        """Блокирующая запись файла; snapshot снимается в event loop, писать можно из потока."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        _write(self._path(), snapshot if snapshot is not None else self.snapshot())
+
+    def _archive_dead(self, now: float) -> None:
+        """Переносит счётчики и гистограммы замолчавших воркеров в ARCHIVE_FILE и удаляет их файлы."""
+        dead = [
+            entry for entry in os.scandir(self.directory)
+            if entry.name.startswith("metrics-") and entry.name != ARCHIVE_FILE
+            and now - entry.stat().st_mtime > settings.METRICS_DEAD_SECONDS
+        ]
+        if not dead:
+            return
+        archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+        archive: dict[str, dict] = {}
+        _merge(archive, _read(archive_path) or {})
+        for entry in dead:
+            if entry.name.endswith(".json"):
+                _merge(archive, _read(entry.path) or {}, gauges=False)
+        # Сначала архив, потом удаление: под блокировкой никто не увидит файл дважды
+        _write(archive_path, _as_snapshot(archive))
+        for entry in dead:
+            with suppress(FileNotFoundError):
+                os.remove(entry.path)
+
+    def _aggregate(self, own: dict) -> dict:
+        if not self.directory:
+            return own
+        self.write_snapshot(own)
+        merged: dict[str, dict] = {}
+        now = time.time()
+        # Архивация и чтение — под одной блокировкой каталога, общей для всех воркеров
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._archive_dead(now)
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".json"):
+                    continue
+                stale = now - entry.stat().st_mtime > settings.METRICS_STALE_SECONDS
+                snapshot = _read(entry.path)
+                if snapshot is not None:
+                    _merge(merged, snapshot, gauges=not stale)
+        return _as_snapshot(merged)
+
+    def render(self, own: Optional[dict] = None) -> str:
+        lines = []
+        for name, data in sorted(self._aggregate(own if own is not None else self.snapshot()).items()):
+            lines.append(f"# HELP {name} {data['help']}")
+            lines.append(f"# TYPE {name} {data['type']}")
+            for labels, value in data["samples"]:
+                labels = [tuple(kv) for kv in labels]
+                if data["type"] == "histogram":
+                    cumulative = 0
+                    for bound, count in zip([*data["buckets"], math.inf], value["counts"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(value['sum'])}")
+                    lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    async def render_async(self) -> str:
+        """Снимок — в event loop (метрики меняются только в нём), файлы и текст — в потоке."""
+        return await asyncio.to_thread(self.render, self.snapshot())
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Sequence[tuple[str, str]], **extra: str) -> str:
+    items = [*labels, *extra.items()]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items) + "}"
+
+
+REGISTRY = Registry(settings.METRICS_MULTIPROC_DIR)
+
+
+async def _flush_periodically(registry: Registry, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(registry.write_snapshot, registry.snapshot())
+
+
+def start_flusher(registry: Registry = REGISTRY) -> Optional[asyncio.Task]:
+    """В многопроцессном режиме периодически сбрасывает снимок воркера, чтобы его видели остальные."""
+    if not registry.directory:
+        return None
+    registry.write_snapshot()
+    return asyncio.create_task(_flush_periodically(registry, settings.METRICS_FLUSH_SECONDS))
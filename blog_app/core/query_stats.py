@@ -0,0 +1,75 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def route_template(scope: dict[str, Any]) -> str:
+    # Шаблон пути (/api/v1/posts/{post_id}), а не сам путь — иначе каждый id отдельной строкой
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """SQL одного запроса к API: сколько выражений, строк и времени в БД."""
+    # ASGI scope запроса: маршрут в нём появляется только после роутинга
+    scope: dict[str, Any] = field(default_factory=dict)
+    statements: int = 0
+    rows: int = 0
+    db_seconds: float = 0.0
+    # (SQL, параметры) каждого выражения — только если попросили (scripts.statement_budget)
+    captured: Optional[list[tuple[str, Any]]] = None
+
+    @property
+    def route(self) -> str:
+        return route_template(self.scope)
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def begin_request(scope: dict[str, Any], capture: bool = False) -> tuple[QueryStats, object]:
+    stats = QueryStats(scope=scope, captured=[] if capture else None)
+    return stats, _current.set(stats)
+
+
+def end_request(token) -> None:
+    _current.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started_at
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.rows += max(cursor.rowcount, 0)
+        stats.db_seconds += elapsed
+        if stats.captured is not None:
+            stats.captured.append((statement, parameters))
+    if elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+        logger.warning(
+            "slow query",
+            extra={
+                "route": stats.route if stats else None,
+                "duration_ms": round(elapsed * 1000, 2),
+                "statement": statement,
+            },
+        )
+
+
+def instrument_engine(async_engine: AsyncEngine) -> None:
+    """Вешает счётчики на выполнение курсора; срабатывают и на реплики, и на основную БД."""
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(async_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
@@ -1,5 +1,8 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional, Literal
+from typing import Any, Callable, Optional, Literal, TypeVar
 from uuid import UUID
 
 import jwt
@@ -9,6 +12,51 @@ from core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+T = TypeVar("T")
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Пул хеширования переполнен — запрос нужно отклонить (503), а не ставить в очередь."""
+
+
+# bcrypt отпускает GIL, поэтому отдельного пула потоков достаточно,
+# чтобы хеширование не блокировало event loop воркера.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_hash_lock = threading.Lock()
+_hash_pending = 0
+
+
+def password_hash_queue_depth() -> int:
+    """Количество задач в пуле хеширования (выполняются + ждут в очереди)."""
+    return _hash_pending
+
+
+def _release_hash_slot(_future) -> None:
+    global _hash_pending
+    with _hash_lock:
+        _hash_pending -= 1
+
+
+async def _run_in_hash_pool(fn: Callable[..., T], *args) -> T:
+    global _hash_pending
+    with _hash_lock:
+        if _hash_pending >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE:
+            raise PasswordHasherBusy("Password hashing pool is saturated")
+        _hash_pending += 1
+
+    # Слот освобождается по завершении работы в потоке, а не по отмене корутины:
+    # отменённый запрос всё равно занимает поток, пока bcrypt не досчитает.
+    future = _hash_executor.submit(fn, *args)
+    future.add_done_callback(_release_hash_slot)
+    return await asyncio.wrap_future(future)
+
+
+def shutdown_hash_pool() -> None:
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
@@ -18,6 +66,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
 def create_jwt_token(
     subject: str | UUID,
     token_type: Literal["access", "refresh"] = "access",
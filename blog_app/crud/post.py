@@ -1,22 +1,97 @@
 from typing import Optional, Sequence
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from sqlalchemy import select, delete
+from fastapi import HTTPException, status
+from sqlalchemy import REAL, Select, any_, literal, select, delete, distinct, func, insert, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import defer, selectinload, with_expression
 
-from models import Post, Tag
+from core.cache import response_cache
+from models import Post, Tag, User, posts_tags
+from models.content_version import POSTS_VERSION, content_version
+from models.post import SEARCH_CONFIG
+from schemas.common import TagBrief
+from schemas.post import PostFilter, PostRead, PostView
+from schemas.user import UserRead
 
+EXCERPT_LENGTH = 200
 
-def _with_rels(stmt):
+# Теги инвалидации кэша ответов (core.cache.response_cache)
+POSTS_LIST_CACHE_TAG = "posts:list"
+
+
+def post_cache_tags(post: Post) -> list[str]:
+    return [f"post:{post.id}", f"user:{post.owner_id}", *(f"tag:{t.id}" for t in post.tags)]
+
+
+def with_rels(stmt):
+    # selectin грузит каждого автора один раз (IN по различным owner_id)
     return stmt.options(
         selectinload(Post.owner),
         selectinload(Post.tags),
     )
 
 
-async def _get_tags_by_ids(session: AsyncSession, tag_ids: Sequence[UUID]) -> list[Tag]:
-    return (await session.execute(select(Tag).where(Tag.id.in_(tag_ids)))).scalars().all()
+def with_summary(stmt):
+    # content не читается вовсе: обрезка делается в SQL, обращение к content — ошибка
+    return stmt.options(
+        defer(Post.content, raiseload=True),
+        with_expression(Post.excerpt, func.left(Post.content, EXCERPT_LENGTH)),
+        selectinload(Post.owner).load_only(User.id, User.username),
+        selectinload(Post.tags),
+    )
+
+
+def with_view(stmt, view: PostView = "full"):
+    return with_summary(stmt) if view == "summary" else with_rels(stmt)
+
+
+def _prefix_upper_bound(prefix: str) -> str | None:
+    # Наименьшая строка, большая всех строк с этим префиксом (в порядке кодовых точек).
+    # Суррогаты (U+D800–U+DFFF) пропускаются: их нельзя закодировать в UTF-8 для asyncpg
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            following = last + 1 if not 0xD800 <= last + 1 <= 0xDFFF else 0xE000
+            return prefix[:-1] + chr(following)
+        prefix = prefix[:-1]
+    return None
+
+
+def prefix_range(column, prefix: str) -> list:
+    """
+    Условия «column начинается с prefix» в виде диапазона по column COLLATE "C".
+    В отличие от LIKE, работают и с параметрами в generic-плане; нужен индекс по выражению.
+    """
+    column = column.collate("C")
+    conditions = [column >= prefix]
+    upper = _prefix_upper_bound(prefix)
+    if upper is not None:
+        conditions.append(column < upper)
+    return conditions
+
+
+def apply_filter(stmt, f: PostFilter | None):
+    """Фильтры поверх select(Post); каждый обслуживается своим индексом."""
+    if f is None:
+        return stmt
+    if f.tag_ids:
+        tag_ids = set(f.tag_ids)
+        tagged = select(posts_tags.c.post_id).where(posts_tags.c.tag_id.in_(tag_ids))
+        if f.tag_mode == "all":
+            tagged = tagged.group_by(posts_tags.c.post_id).having(func.count() == len(tag_ids))
+        stmt = stmt.where(Post.id.in_(tagged))
+    if f.owner_id is not None:
+        stmt = stmt.where(Post.owner_id == f.owner_id)
+    if f.created_after is not None:
+        stmt = stmt.where(Post.created_at >= f.created_after)
+    if f.created_before is not None:
+        stmt = stmt.where(Post.created_at < f.created_before)
+    if f.title_prefix:
+        # индекс ix_posts_title_c
+        stmt = stmt.where(*prefix_range(Post.title, f.title_prefix))
+    return stmt
 
 
 # Получение одного поста без связей (для проверок/прав)
@@ -27,25 +102,188 @@ async def get_post(session: AsyncSession, post_id: UUID) -> Optional[Post]:
 
 # Получение одного поста с подгруженными связями (для ответа)
 async def get_post_with_rels(session: AsyncSession, post_id: UUID) -> Optional[Post]:
-    stmt = _with_rels(select(Post).where(Post.id == post_id))
+    stmt = with_rels(select(Post).where(Post.id == post_id))
     return (await session.execute(stmt)).scalar_one_or_none()
 
 
-async def get_posts_all(session: AsyncSession) -> list[Post]:
-    stmt = _with_rels(select(Post)).order_by(Post.created_at.desc())
-    return (await session.execute(stmt)).scalars().all()
+async def get_posts_version(session: AsyncSession, stmt: Select) -> tuple:
+    """
+    Дешёвая «версия» ограниченного набора постов для ETag — без загрузки строк и связей.
+    stmt — select(Post) с фильтрами/сортировкой/limit, но без loader-опций.
+    Учитывает правки постов и переименование/удаление их тегов.
+    Агрегирует весь набор, поэтому полные списки берут get_posts_list_version.
+    """
+    page = stmt.with_only_columns(Post.id, Post.created_at, Post.updated_at).subquery()
+    version_stmt = select(
+        func.count(distinct(page.c.id)),
+        func.max(func.coalesce(page.c.updated_at, page.c.created_at)),
+        func.count(Tag.id),
+        func.max(func.coalesce(Tag.updated_at, Tag.created_at)),
+    ).select_from(
+        page.outerjoin(posts_tags, posts_tags.c.post_id == page.c.id)
+        .outerjoin(Tag, Tag.id == posts_tags.c.tag_id)
+    )
+    return tuple((await session.execute(version_stmt)).one())
+
+
+async def get_posts_list_version(session: AsyncSession) -> int:
+    """Версия всех постов со связями: сумма по content_version_log, ведётся триггерами."""
+    return (await session.execute(select(content_version(POSTS_VERSION)))).scalar_one()
+
+
+def posts_all_stmt(view: PostView = "full", f: PostFilter | None = None):
+    stmt = apply_filter(with_view(select(Post), view), f)
+    return stmt.order_by(Post.created_at.desc(), Post.id.desc())
+
+
+async def get_posts_all(
+    session: AsyncSession,
+    view: PostView = "full",
+    f: PostFilter | None = None,
+) -> list[Post]:
+    return (await session.execute(posts_all_stmt(view, f))).scalars().all()
+
+
+def normalized_stmt(view: PostView = "full") -> Select:
+    """Колонки постов без связей — для normalized-формата, связи грузит load_normalized."""
+    body = Post.content if view == "full" else func.left(Post.content, EXCERPT_LENGTH).label("excerpt")
+    return select(Post.id, Post.title, body, Post.owner_id, Post.created_at, Post.updated_at)
+
+
+def in_ids(column, ids):
+    # column = ANY(:ids) с одним параметром uuid[]: IN дал бы параметр на каждый id,
+    # а у asyncpg их не больше 32767 — на полной ленте это не предел
+    return column == any_(literal(list(ids), ARRAY(PG_UUID(as_uuid=True))))
+
 
+async def load_normalized(session: AsyncSession, rows: Sequence, view: PostView = "full") -> dict:
+    """
+    Дополняет строки normalized_stmt авторами и тегами: каждый автор и тег читается ровно один раз.
+    Теги — одним GROUP BY с id постов, в которых они встречаются.
+    """
+    post_ids = [r.id for r in rows]
+    owner_ids = {r.owner_id for r in rows}
+    user_columns = [User.id, User.username]
+    if view == "full":
+        user_columns += [User.email, User.is_active, User.is_superuser, User.created_at]
 
-async def get_posts_me(session: AsyncSession, user_id: UUID) -> list[Post]:
+    users, tags, tag_ids_by_post = {}, {}, {}
+    if post_ids:
+        user_rows = await session.execute(select(*user_columns).where(in_ids(User.id, owner_ids)))
+        users = {u.id: u._asdict() for u in user_rows}
+        tag_rows = await session.execute(
+            select(Tag.id, Tag.name, func.array_agg(posts_tags.c.post_id).label("post_ids"))
+            .join(posts_tags, posts_tags.c.tag_id == Tag.id)
+            .where(in_ids(posts_tags.c.post_id, post_ids))
+            .group_by(Tag.id)
+            .order_by(Tag.name)
+        )
+        for t in tag_rows:
+            tags[t.id] = {"id": t.id, "name": t.name}
+            for post_id in t.post_ids:
+                tag_ids_by_post.setdefault(post_id, []).append(t.id)
+
+    return {
+        "posts": [{**r._asdict(), "tag_ids": tag_ids_by_post.get(r.id, [])} for r in rows],
+        "users": users,
+        "tags": tags,
+    }
+
+
+async def get_posts_me(session: AsyncSession, user_id: UUID, view: PostView = "full") -> list[Post]:
     stmt = (
-        _with_rels(select(Post))
+        with_view(select(Post), view)
         .where(Post.owner_id == user_id)
-        .order_by(Post.created_at.desc())
+        .order_by(Post.created_at.desc(), Post.id.desc())
     )
     return (await session.execute(stmt)).scalars().all()
 
 
-# Создание поста (возвращаем уже с подгруженными связями)
+# ts_headline: до двух фрагментов текста вокруг совпадений
+SEARCH_HEADLINE_OPTIONS = "MaxFragments=2, MaxWords=30, MinWords=10, FragmentDelimiter= … "
+
+
+def search_query(q: str):
+    # websearch_to_tsquery не падает на синтаксисе пользователя ("фраза", -слово, or)
+    return func.websearch_to_tsquery(SEARCH_CONFIG, q)
+
+
+def search_rank(q: str):
+    return func.ts_rank(Post.search_vector, search_query(q), type_=REAL).label("rank")
+
+
+def search_posts_stmt(q: str) -> Select:
+    """
+    Посты, подходящие под q, через GIN-индекс ix_posts_search_vector.
+    ts_headline дорогой, но Postgres вычисляет его уже после сортировки и LIMIT —
+    только для строк страницы.
+    """
+    query = search_query(q)
+    headline = func.ts_headline(
+        SEARCH_CONFIG, Post.content, query, SEARCH_HEADLINE_OPTIONS
+    ).label("headline")
+    return (
+        select(Post.id, Post.title, Post.created_at, search_rank(q), headline)
+        .where(Post.search_vector.op("@@")(query))
+    )
+
+
+def search_match(q: str) -> Select:
+    # Тот же набор строк, но select(Post) — для get_posts_version
+    return select(Post).where(Post.search_vector.op("@@")(search_query(q)))
+
+
+def _post_with_owner(post_cte) -> Select:
+    # Строка поста из RETURNING + его автор одним запросом
+    return select(
+        post_cte,
+        User.id.label("u_id"),
+        User.username,
+        User.email,
+        User.is_active,
+        User.is_superuser,
+        User.created_at.label("u_created_at"),
+    ).join(User, User.id == post_cte.c.owner_id)
+
+
+def _post_read(row, tags: Sequence) -> PostRead:
+    # PostRead собирается из уже полученных строк, без повторного чтения поста и связей
+    return PostRead(
+        id=row.id,
+        title=row.title,
+        content=row.content,
+        owner=UserRead(
+            id=row.u_id,
+            username=row.username,
+            email=row.email,
+            is_active=row.is_active,
+            is_superuser=row.is_superuser,
+            created_at=row.u_created_at,
+        ),
+        tags=[TagBrief(id=t.id, name=t.name) for t in tags],
+        created_at=row.created_at,
+        updated_at=row.updated_at,
+    )
+
+
+async def _get_tag_briefs(session: AsyncSession, tag_ids: Sequence[UUID]):
+    # Заодно отсекает несуществующие id
+    if not tag_ids:
+        return []
+    return (await session.execute(select(Tag.id, Tag.name).where(Tag.id.in_(set(tag_ids))))).all()
+
+
+_POST_RETURNING = (
+    Post.__table__.c.id,
+    Post.__table__.c.title,
+    Post.__table__.c.content,
+    Post.__table__.c.owner_id,
+    Post.__table__.c.created_at,
+    Post.__table__.c.updated_at,
+)
+
+
+# Создание поста: INSERT поста и связей + автор одним запросом
 async def create_post(
     session: AsyncSession,
     *,
@@ -53,41 +291,97 @@ async def create_post(
     content: str,
     owner_id: UUID,
     tag_ids: Optional[Sequence[UUID]] = None,
-) -> Post:
-    tags: list[Tag] = []
-    if tag_ids:
-        tags = await _get_tags_by_ids(session, tag_ids)
-
-    post = Post(
-        title=title,
-        content=content,
-        owner_id=owner_id,
-        tags=tags
+) -> PostRead:
+    tags = await _get_tag_briefs(session, tag_ids)
+
+    post_id = uuid4()
+    new_post = (
+        insert(Post.__table__)
+        .values(id=post_id, title=title, content=content, owner_id=owner_id)
+        .returning(*_POST_RETURNING)
+        .cte("new_post")
     )
-    session.add(post)
+    stmt = _post_with_owner(new_post)
+    if tags:
+        new_links = insert(posts_tags).values([{"post_id": post_id, "tag_id": t.id} for t in tags]).cte("new_links")
+        stmt = stmt.add_cte(new_links)
+
+    row = (await session.execute(stmt)).one()
     await session.commit()
-    # Возвращаем с отношениями
-    return await get_post_with_rels(session, post.id)
+    await response_cache.invalidate(POSTS_LIST_CACHE_TAG)
+    return _post_read(row, tags)
 
 
-# Обновление поста (на вход — уже загруженный Post без связей)
+# Обновление поста: права проверяются в WHERE, теги меняются разницей множеств
 async def update_post(
     session: AsyncSession,
-    post: Post,
+    post_id: UUID,
     *,
+    user_id: UUID,
+    is_superuser: bool,
     title: Optional[str] = None,
     content: Optional[str] = None,
     tag_ids: Optional[Sequence[UUID]] = None
-) -> Post:
+) -> PostRead:
+    posts = Post.__table__
+    values = {}
     if title is not None:
-        post.title = title
+        values["title"] = title
     if content is not None:
-        post.content = content
+        values["content"] = content
+    if not values:
+        # смена одних тегов двигает updated_at (ETag), пустой PATCH — нет
+        values["updated_at"] = func.now() if tag_ids is not None else posts.c.updated_at
+
+    where = posts.c.id == post_id
+    if not is_superuser:
+        where = where & (posts.c.owner_id == user_id)
+    updated = update(posts).where(where).values(**values).returning(*_POST_RETURNING).cte("updated_post")
+    stmt = _post_with_owner(updated)
+
+    tags = None
     if tag_ids is not None:
-        post.tags = await _get_tags_by_ids(session, tag_ids)
+        tags = await _get_tag_briefs(session, tag_ids)
+        new_ids = [t.id for t in tags]
+        # CTE видят один снимок данных: удаление лишних и вставка новых связей не пересекаются
+        removed = delete(posts_tags).where(
+            posts_tags.c.post_id.in_(select(updated.c.id)),
+            posts_tags.c.tag_id.not_in(new_ids),
+        ).cte("removed_links")
+        stmt = stmt.add_cte(removed)
+        if new_ids:
+            added = (
+                pg_insert(posts_tags)
+                .from_select(
+                    ["post_id", "tag_id"],
+                    # updated_post — одна строка; явный ON вместо декартова FROM (линтер SQLAlchemy)
+                    select(updated.c.id, Tag.id).join_from(updated, Tag, Tag.id.in_(new_ids)),
+                )
+                .on_conflict_do_nothing()
+                .cte("added_links")
+            )
+            stmt = stmt.add_cte(added)
+
+    row = (await session.execute(stmt)).one_or_none()
+    if row is None:
+        # ничего не обновлено: поста нет или он чужой
+        await session.rollback()
+        exists = (await session.execute(select(Post.id).where(Post.id == post_id))).scalar_one_or_none()
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
 
+    if tags is None:
+        tags = (
+            await session.execute(
+                select(Tag.id, Tag.name)
+                .join(posts_tags, posts_tags.c.tag_id == Tag.id)
+                .where(posts_tags.c.post_id == post_id)
+            )
+        ).all()
     await session.commit()
-    return await get_post_with_rels(session, post.id)
+    await response_cache.invalidate(POSTS_LIST_CACHE_TAG, f"post:{post_id}")
+    return _post_read(row, tags)
 
 
 async def delete_post(
@@ -96,3 +390,4 @@ async def delete_post(
 ):
     await session.execute(delete(Post).where(Post.id == post_id))
     await session.commit()
+    await response_cache.invalidate(POSTS_LIST_CACHE_TAG, f"post:{post_id}")
@@ -0,0 +1,144 @@
+import asyncio
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import AsyncIterator, NamedTuple, Optional
+from uuid import UUID, uuid4
+
+import asyncpg
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import response_cache
+from crud.post import POSTS_LIST_CACHE_TAG
+from crud.tags import normalize_tag_names, resolve_tag_ids
+from models import User
+from schemas.post import PostImport, PostImportError, PostImportResult
+
+POST_COLUMNS = ["id", "title", "content", "owner_id", "created_at"]
+POST_TAG_COLUMNS = ["post_id", "tag_id"]
+
+# Не ошибки данных: после них продолжать импорт нельзя
+CONNECTION_ERRORS = (SQLAlchemyError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError)
+
+
+class PreparedRow(NamedTuple):
+    index: int
+    post: tuple
+    links: list[tuple]
+
+
+async def _copy_records(session: AsyncSession, posts: list[tuple], links: list[tuple]) -> None:
+    conn = (await (await session.connection()).get_raw_connection()).driver_connection
+    await conn.copy_records_to_table("posts", records=posts, columns=POST_COLUMNS)
+    if links:
+        await conn.copy_records_to_table("posts_tags", records=links, columns=POST_TAG_COLUMNS)
+
+
+async def _copy_isolating(session: AsyncSession, rows: list[PreparedRow], result: PostImportResult) -> int:
+    """
+    COPY строк в savepoint. При ошибке Postgres строки делятся пополам, пока ошибка
+    не сведётся к отдельным строкам — они и попадают в errors со своим индексом и текстом.
+    Возвращает число записанных строк.
+    """
+    try:
+        async with session.begin_nested():
+            await _copy_records(session, [r.post for r in rows], [link for r in rows for link in r.links])
+        return len(rows)
+    except asyncpg.PostgresError as e:
+        if len(rows) == 1:
+            result.errors.append(PostImportError(index=rows[0].index, detail=str(e)))
+            return 0
+        mid = len(rows) // 2
+        return await _copy_isolating(session, rows[:mid], result) + await _copy_isolating(session, rows[mid:], result)
+
+
+async def _copy_chunk(
+    session: AsyncSession,
+    chunk: list[tuple[int, PostImport]],
+    *,
+    owner_id: UUID,
+    tag_ids: dict[str, UUID],
+    result: PostImportResult,
+) -> None:
+    # Теги: каждое имя резолвится один раз за весь импорт
+    names = {n for _, row in chunk for n in normalize_tag_names(row.tags)} - tag_ids.keys()
+    if names:
+        names = sorted(names)
+        tag_ids.update(zip(names, await resolve_tag_ids(session, names)))
+
+    # Неизвестный автор уронил бы весь COPY по FK — отсеиваем такие строки заранее
+    owners = {row.owner_id or owner_id for _, row in chunk}
+    known = set((await session.execute(select(User.id).where(User.id.in_(owners)))).scalars())
+
+    now = datetime.now(timezone.utc)
+    prepared = []
+    for index, row in chunk:
+        row_owner = row.owner_id or owner_id
+        if row_owner not in known:
+            result.errors.append(PostImportError(index=index, detail="Owner not found"))
+            continue
+        post_id = uuid4()
+        prepared.append(
+            PreparedRow(
+                index=index,
+                post=(post_id, row.title, row.content, row_owner, row.created_at or now),
+                links=[(post_id, tag_ids[n]) for n in normalize_tag_names(row.tags)],
+            )
+        )
+
+    if not prepared:
+        return
+    imported = await _copy_isolating(session, prepared, result)
+    await session.commit()
+    result.imported += imported
+
+
+async def import_posts(
+    session: AsyncSession,
+    rows: AsyncIterator[tuple[Optional[PostImport], Optional[str]]],
+    *,
+    owner_id: UUID,
+    chunk_size: int,
+) -> PostImportResult:
+    """
+    Массовый импорт постов через COPY пачками по chunk_size строк, каждая пачка — своя транзакция.
+    rows — (строка, None) или (None, текст ошибки разбора) в порядке входа.
+    Ошибочные строки попадают в result.errors и не прерывают импорт.
+    Ошибка соединения прерывает импорт: результат — по уже записанным пачкам, причина в result.aborted.
+    """
+    result = PostImportResult()
+    tag_ids: dict[str, UUID] = {}
+    chunk: list[tuple[int, PostImport]] = []
+
+    async def flush() -> bool:
+        try:
+            await _copy_chunk(session, chunk, owner_id=owner_id, tag_ids=tag_ids, result=result)
+        except CONNECTION_ERRORS as e:
+            # Соединение потеряно: записанные пачки остаются, остальное — не импортировано
+            with suppress(*CONNECTION_ERRORS):
+                await session.rollback()
+            result.errors.extend(PostImportError(index=i, detail="Import aborted") for i, _ in chunk)
+            cause = getattr(e, "orig", None) or e
+            result.aborted = f"{type(cause).__name__}: {cause}"
+            return False
+        chunk.clear()
+        return True
+
+    index = 0
+    async for row, error in rows:
+        if error is not None:
+            result.errors.append(PostImportError(index=index, detail=error))
+        else:
+            chunk.append((index, row))
+            if len(chunk) >= chunk_size and not await flush():
+                break
+        index += 1
+    else:
+        if chunk:
+            await flush()
+
+    result.failed = len(result.errors)
+    if result.imported:
+        await response_cache.invalidate(POSTS_LIST_CACHE_TAG)
+    return result
@@ -1,26 +1,85 @@
-from typing import Sequence
+import asyncio
+import logging
+from typing import Optional, Sequence
 from uuid import UUID
 
-import sqlalchemy as sa
 from fastapi import HTTPException
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from models import Post, Tag
+from core.cache import PrefixIndex, TTLCache, response_cache
+from core.config import settings
+from core.db import AsyncSessionLocal
+from crud.post import POSTS_LIST_CACHE_TAG, prefix_range
+from models import Post, Tag, posts_tags
+from models.content_version import POSTS_VERSION, TAGS_VERSION, content_version
 
+logger = logging.getLogger(__name__)
 
-def _with_rels(stmt):
-    return stmt.options(
-        selectinload(Post.owner),
-        selectinload(Post.tags),
+# Имена тегов процесса: name -> id, только для подсказок (suggest). Свои записи применяются сразу,
+# чужие (другие воркеры) — при перечитывании раз в TAG_INDEX_REFRESH_SECONDS
+tag_index: PrefixIndex[UUID] = PrefixIndex()
+_tag_index_refresh: Optional[asyncio.Task] = None
+
+# name -> id для resolve_tag_ids: ограничен по размеру и TTL, сбрасывается при переименовании и удалении
+tag_id_cache: TTLCache[str, UUID] = TTLCache(settings.TAG_ID_CACHE_MAXSIZE, settings.TAG_ID_CACHE_TTL_SECONDS)
+
+
+async def warm_tag_index() -> None:
+    """
+    Загружает tag_index целиком и первые TAG_ID_CACHE_MAXSIZE тегов в tag_id_cache;
+    при ошибке оба остаются холодными и запросы идут в БД.
+    """
+    try:
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(select(Tag.name, Tag.id))).all()
+    except Exception:
+        logger.exception("tag index warm-up failed")
+        return
+    tag_index.load(rows)
+    for name, id_ in rows[:settings.TAG_ID_CACHE_MAXSIZE]:
+        tag_id_cache.set(name, id_)
+
+
+def _schedule_tag_index_refresh() -> None:
+    global _tag_index_refresh
+    if _tag_index_refresh is None or _tag_index_refresh.done():
+        _tag_index_refresh = asyncio.create_task(warm_tag_index())
+
+
+async def get_tags_version(session: AsyncSession) -> int:
+    """Версия списка тегов с post_count: сумма по content_version_log, ведётся триггерами."""
+    return (await session.execute(select(content_version(TAGS_VERSION)))).scalar_one()
+
+
+async def get_tag_version(session: AsyncSession, tag_id: UUID) -> tuple | None:
+    """
+    Версия тега вместе с его постами; None — тега нет.
+    Посты тега берут общую версию постов: счётчик на строке тега блокировал бы писателей с общими тегами.
+    """
+    stmt = select(Tag.created_at, Tag.updated_at, content_version(POSTS_VERSION)).where(Tag.id == tag_id)
+    row = (await session.execute(stmt)).one_or_none()
+    return tuple(row) if row else None
+
+
+def tags_list_stmt():
+    # Один GROUP BY по posts_tags, без материализации Tag.posts
+    return (
+        select(
+            Tag.id,
+            Tag.name,
+            Tag.created_at,
+            func.count(posts_tags.c.post_id).label("post_count"),
+        )
+        .outerjoin(posts_tags, posts_tags.c.tag_id == Tag.id)
+        .group_by(Tag.id)
+        .order_by(Tag.name.asc())
     )
 
 
 async def get_tags(session: AsyncSession):
-    stmt = select(Tag).order_by(Tag.name.asc())
-    return (await session.execute(stmt)).scalars().all()
+    return (await session.execute(tags_list_stmt())).all()
 
 
 async def get_tag(
@@ -30,6 +89,32 @@ async def get_tag(
     return (await session.execute(select(Tag).where(Tag.id == tag_id))).scalar_one_or_none()
 
 
+def tag_posts_stmt(tag_id: UUID):
+    """Посты тега (PostBrief-колонки) через индекс posts_tags (tag_id, post_id); сортирует пагинатор."""
+    return (
+        select(Post.id, Post.title, Post.created_at)
+        .join(posts_tags, posts_tags.c.post_id == Post.id)
+        .where(posts_tags.c.tag_id == tag_id)
+    )
+
+
+async def suggest_tags(session: AsyncSession, prefix: str, limit: int) -> list[dict]:
+    """Теги, чьё имя начинается с prefix, по алфавиту: из tag_index, а пока он холодный — из БД."""
+    prefix = prefix.strip().lower()
+    if tag_index.is_fresh(settings.TAG_INDEX_REFRESH_SECONDS):
+        return [{"id": id_, "name": name} for name, id_ in tag_index.search(prefix, limit)]
+
+    _schedule_tag_index_refresh()
+    # индекс ix_tags_name_c
+    stmt = (
+        select(Tag.id, Tag.name)
+        .where(*prefix_range(Tag.name, prefix))
+        .order_by(Tag.name.collate("C"))
+        .limit(limit)
+    )
+    return [row._asdict() for row in (await session.execute(stmt)).all()]
+
+
 async def create_tag(
     session: AsyncSession,
     *,
@@ -42,6 +127,8 @@ async def create_tag(
     session.add(tag)
     await session.commit()
     await session.refresh(tag)
+    tag_index.add(tag.name, tag.id)
+    tag_id_cache.set(tag.name, tag.id)
     return tag
 
 
@@ -51,10 +138,16 @@ async def update_tag(
     *,
     name: str
 ) -> Tag:
+    old_name = tag.name
     if name is not None:
         tag.name = name
     await session.commit()
     await session.refresh(tag)
+    tag_index.discard(old_name)
+    tag_index.add(tag.name, tag.id)
+    tag_id_cache.invalidate(old_name)
+    tag_id_cache.set(tag.name, tag.id)
+    await response_cache.invalidate(POSTS_LIST_CACHE_TAG, f"tag:{tag.id}")
     return tag
 
 
@@ -62,13 +155,17 @@ async def delete_tag(
     tag_id: UUID,
     session: AsyncSession,
 ):
-    await session.execute(delete(Tag).where(Tag.id == tag_id))
+    name = (await session.execute(delete(Tag).where(Tag.id == tag_id).returning(Tag.name))).scalar_one_or_none()
     await session.commit()
+    if name is not None:
+        tag_index.discard(name)
+        tag_id_cache.invalidate(name)
+    await response_cache.invalidate(POSTS_LIST_CACHE_TAG, f"tag:{tag_id}")
 
 
 # resolve
 
-def _normalize_unique_ordered(names: Sequence[str]) -> list[str]:
+def normalize_tag_names(names: Sequence[str]) -> list[str]:
     seen = set()
     result: list[str] = []
     for n in names or []:
@@ -86,27 +183,40 @@ async def resolve_tag_ids(session: AsyncSession, names: Sequence[str]) -> list[U
     """
     Возвращает список UUID тегов в порядке переданных имён (после нормализации и удаления дублей).
     Отсутствующие теги создаёт.
+    Имена из tag_id_cache — без запросов; остальные — INSERT ... ON CONFLICT DO NOTHING RETURNING
+    и SELECT только тех, что уже были в БД.
     """
-    norm_names = _normalize_unique_ordered(names)
+    norm_names = normalize_tag_names(names)
     if not norm_names:
         return []
 
-    # Вставляем все разом; существующие — игнорируются (без исключений)
-    values = [{"name": n} for n in norm_names]
-    insert_stmt = (
-        pg_insert(Tag.__table__)
-        .values(values)
-        .on_conflict_do_nothing(index_elements=[Tag.__table__.c.name])
-    )
-    await session.execute(insert_stmt)
-
-    # Забираем id всех нужных тегов
-    rows = await session.execute(
-        sa.select(Tag.id, Tag.name).where(Tag.name.in_(norm_names))
-    )
-    id_by_name = {name: id_ for id_, name in rows.all()}
-
-    # Должны быть все, иначе это ошибка целостности
-    ids = [id_by_name[n] for n in norm_names]
-    await session.commit()
-    return ids
+    id_by_name: dict[str, UUID] = {}
+    for n in norm_names:
+        id_ = tag_id_cache.get(n)
+        if id_ is not None:
+            id_by_name[n] = id_
+    # По порядку: параллельные resolve с общими новыми именами ждут друг друга в одном порядке
+    missing = sorted(n for n in norm_names if n not in id_by_name)
+
+    if missing:
+        # DO NOTHING не переписывает и не блокирует существующие строки, RETURNING отдаёт только новые
+        insert_stmt = (
+            pg_insert(Tag.__table__)
+            .values([{"name": n} for n in missing])
+            .on_conflict_do_nothing(index_elements=[Tag.__table__.c.name])
+            .returning(Tag.__table__.c.id, Tag.__table__.c.name)
+        )
+        rows = (await session.execute(insert_stmt)).all()
+        existing = set(missing) - {name for _, name in rows}
+        if existing:
+            rows += (await session.execute(select(Tag.id, Tag.name).where(Tag.name.in_(existing)))).all()
+        await session.commit()
+        for id_, name in rows:
+            id_by_name[name] = id_
+            tag_id_cache.set(name, id_)
+            tag_index.add(name, id_)
+
+    if len(id_by_name) < len(norm_names):
+        # тег удалили между INSERT и SELECT
+        raise HTTPException(status_code=409, detail="Tag was deleted concurrently, retry")
+    return [id_by_name[n] for n in norm_names]
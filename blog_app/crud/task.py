@@ -1,8 +1,8 @@
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload
 
 from models import Task
 
@@ -11,19 +11,35 @@ from models import Task
 #     stmt = select(Task).order_by(Task.title.asc())
 #     return (await session.execute(stmt)).scalars().all()
 
+async def get_tasks_version(session: AsyncSession) -> tuple:
+    stmt = select(func.count(Task.id), func.max(func.coalesce(Task.updated_at, Task.created_at)))
+    return tuple((await session.execute(stmt)).one())
+
+
+async def get_task_version(session: AsyncSession, task_id: UUID) -> tuple | None:
+    stmt = select(Task.created_at, Task.updated_at).where(Task.id == task_id)
+    row = (await session.execute(stmt)).one_or_none()
+    return tuple(row) if row else None
+
+
+def with_owner(stmt):
+    # owner — many-to-one: JOIN в том же запросе; selectin бил бы список пачками по 500 авторов
+    return stmt.options(joinedload(Task.owner))
+
+
+def tasks_list_stmt():
+    return with_owner(select(Task)).order_by(Task.title.asc())
+
+
 async def get_tasks(session: AsyncSession):
-    stmt = (
-        select(Task)
-        .options(selectinload(Task.owner))  # подгружаем owner заранее
-        .order_by(Task.title.asc())
-    )
-    return (await session.execute(stmt)).scalars().all()
+    return (await session.execute(tasks_list_stmt())).scalars().all()
 
 async def get_task(
     task_id: UUID,
     session: AsyncSession
 ) -> Task:
-    return (await session.execute(select(Task).where(Task.id == task_id))).scalar_one_or_none()
+    # TaskRead включает owner: без явной загрузки было бы неявное ленивое чтение
+    return (await session.execute(with_owner(select(Task).where(Task.id == task_id)))).scalar_one_or_none()
 
 
 async def create_task(
@@ -40,5 +56,4 @@ async def create_task(
     )
     session.add(task)
     await session.commit()
-    await session.refresh(task)
-    return task
+    return await get_task(task.id, session)
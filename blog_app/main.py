@@ -6,13 +6,24 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from api import router as api_router
+from api.metrics import metrics_middleware, router as metrics_router
+from api.middleware import read_your_writes, sql_timing
 from core.config import settings
+from core.metrics import REGISTRY, start_flusher
+from core.security import shutdown_hash_pool
+from crud.tags import warm_tag_index
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # тут можно положить health-check БД, warm-up кэша и т.п.
+    await warm_tag_index()
+    metrics_flusher = start_flusher()
     yield
+    if metrics_flusher:
+        metrics_flusher.cancel()
+        REGISTRY.write_snapshot()
+    shutdown_hash_pool()
 
 
 app = FastAPI(
@@ -31,6 +42,15 @@ if settings.CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+# Чтение своих записей при работе через реплики
+app.middleware("http")(read_your_writes)
+# Число SQL-выражений и время в БД на запрос (Server-Timing, лог)
+app.middleware("http")(sql_timing)
+
+if settings.METRICS_ENABLED:
+    app.middleware("http")(metrics_middleware)
+    app.include_router(metrics_router)
+
 app.include_router(api_router)
 
 base_dir = "/home/bato/fastApiProjects/blog_proj/" # заменить потом через os base dir
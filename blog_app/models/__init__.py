@@ -7,6 +7,7 @@ __all__ = [
     "Task",
     "TaskStatus",
     "TimeEntry",
+    "content_version_log",
 ]
 
 from .base import Base
@@ -14,3 +15,4 @@ from .post import Post, Tag, posts_tags
 from .user import User
 from .task import Task, TaskStatus
 from .time_entry import TimeEntry
+from .content_version import content_version_log
@@ -0,0 +1,29 @@
+from sqlalchemy import BigInteger, Column, Identity, Index, String, Table, func, select
+
+from models.base import Base
+
+# Журнал изменений для ETag списков: версия набора данных — сумма weight по его имени.
+# Строки вставляют триггеры на posts/posts_tags/tags (миграции 2f6a9d0c4e18, c7d2e4f81a39) в той же
+# транзакции, что и изменение, — в том числе при COPY, каскадах и ручном SQL. Только INSERT,
+# без UPDATE общей строки — параллельные писатели друг друга не ждут.
+content_version_log = Table(
+    "content_version_log",
+    Base.metadata,
+    Column("id", BigInteger, Identity(), primary_key=True),
+    Column("name", String(50), nullable=False),
+    Column("weight", BigInteger, nullable=False, server_default="1"),
+    Index("ix_content_version_log_name", "name", postgresql_include=["weight"]),
+)
+
+POSTS_VERSION = "posts"
+TAGS_VERSION = "tags"
+
+
+def content_version(name: str):
+    """Текущая версия набора name — скалярный подзапрос (index-only scan по ix_content_version_log_name)."""
+    weight = content_version_log.c.weight
+    return (
+        select(func.coalesce(func.sum(weight), 0))
+        .where(content_version_log.c.name == name)
+        .scalar_subquery()
+    )
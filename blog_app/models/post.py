@@ -2,18 +2,23 @@ from __future__ import annotations
 from datetime import datetime
 from uuid import uuid4, UUID
 
-from sqlalchemy import String, Text, DateTime, ForeignKey, func, Table, Column
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Text, DateTime, ForeignKey, func, Table, Column, Index, Computed, text
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID as PG_UUID
+from sqlalchemy.orm import Mapped, mapped_column, query_expression, relationship
 
 from models.base import Base
 
+# Конфигурация полнотекстового поиска: одна и та же в колонке и в запросах
+SEARCH_CONFIG = "russian"
+
 # Association table: posts <-> tags (many-to-many)
 posts_tags = Table(
     "posts_tags",
     Base.metadata,
     Column("post_id", PG_UUID(as_uuid=True), ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True),
     Column("tag_id", PG_UUID(as_uuid=True), ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    # PK (post_id, tag_id) не помогает искать посты тега — нужен обратный порядок
+    Index("ix_posts_tags_tag_id_post_id", "tag_id", "post_id"),
 )
 
 
@@ -23,18 +28,43 @@ class Post(Base):
     id: Mapped[UUID] = mapped_column(primary_key=True, default=uuid4)
     title: Mapped[str] = mapped_column(String(200), index=True)
     content: Mapped[str] = mapped_column(Text)
+    # Заполняется только запросами списка (with_expression), см. crud.post.with_summary
+    excerpt: Mapped[str | None] = query_expression()
+    # Генерируется Postgres; заголовок весит больше текста. Обычными запросами не читается
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
-    owner_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    # индекс по owner_id покрывается составным ix_posts_owner_id_created_at
+    owner_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     owner: Mapped["User"] = relationship(back_populates="posts")
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), onupdate=func.now())
 
+    # Связи грузятся только явно в запросе (selectinload и т.п.): неявная загрузка — ошибка
     tags: Mapped[list["Tag"]] = relationship(
         "Tag",
         secondary=posts_tags,
         back_populates="posts",
-        lazy="selectin",
+        lazy="raise_on_sql",
+    )
+
+    __table_args__ = (
+        # Лента: ORDER BY created_at DESC, id DESC + keyset по (created_at, id)
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        # Посты пользователя: WHERE owner_id = ? ORDER BY created_at DESC, id DESC
+        Index("ix_posts_owner_id_created_at", "owner_id", "created_at", "id"),
+        # Поиск по префиксу заголовка: диапазон по title COLLATE "C"
+        Index("ix_posts_title_c", text('title COLLATE "C"')),
+        # Полнотекстовый поиск: search_vector @@ tsquery
+        Index("ix_posts_search_vector", "search_vector", postgresql_using="gin"),
     )
 
 
@@ -45,10 +75,16 @@ class Tag(Base):
     name: Mapped[str] = mapped_column(String(50), unique=True, index=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), onupdate=func.now())
 
     posts: Mapped[list["Post"]] = relationship(
         "Post",
         secondary=posts_tags,
         back_populates="tags",
-        lazy="selectin",
-    )
\ No newline at end of file
+        lazy="raise_on_sql",
+    )
+
+    __table_args__ = (
+        # GET /tags/suggest без прогретого индекса в памяти: диапазон по name COLLATE "C"
+        Index("ix_tags_name_c", text('name COLLATE "C"')),
+    )
@@ -49,5 +49,5 @@ class Task(Base):
     time_entries: Mapped[list["TimeEntry"]] = relationship(
         back_populates="task",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise_on_sql",
     )
@@ -2,7 +2,7 @@ from __future__ import annotations
 from datetime import datetime
 from uuid import uuid4, UUID
 
-from sqlalchemy import String, Boolean, DateTime, func
+from sqlalchemy import String, Boolean, DateTime, Integer, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from models.base import Base
@@ -18,6 +18,8 @@ class User(Base):
     hashed_password: Mapped[str] = mapped_column(String(128))
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, server_default="true")
     is_superuser: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    # Увеличивается, чтобы отозвать все выданные пользователю токены
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), onupdate=func.now())
@@ -25,10 +27,11 @@ class User(Base):
     posts: Mapped[list["Post"]] = relationship(back_populates="owner", cascade="all, delete-orphan")
     tasks: Mapped[list["Task"]] = relationship(back_populates="owner", cascade="all, delete-orphan")
 
+    # Раньше selectin: каждая загрузка User (автор поста, задачи) тянула ещё и все его записи времени
     time_entries: Mapped[list["TimeEntry"]] = relationship(
         back_populates="user",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise_on_sql",
     )
 
     def __repr__(self) -> str:
@@ -1,11 +1,16 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Annotated, Generic, Literal, Optional, List, TypeVar
 from uuid import UUID
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 # from schemas.tag import TagRead
 from schemas.user import UserRead
-from schemas.common import TagBrief
+from schemas.common import TagBrief, UserBrief
+
+# full — PostRead целиком, summary — PostSummary без content
+PostView = Literal["full", "summary"]
+# nested — автор и теги внутри каждого поста, normalized — отдельными словарями по id
+PostsFormat = Literal["nested", "normalized"]
 
 
 class PostBase(BaseModel):
@@ -34,3 +39,96 @@ class PostRead(BaseModel):
     tags: List[TagBrief]
     created_at: datetime
     updated_at: Optional[datetime] = None
+
+
+class PostImport(BaseModel):
+    """Строка массового импорта: теги — именами, автор по умолчанию — импортирующий."""
+    title: str = Field(max_length=200)
+    content: str
+    owner_id: Optional[UUID] = None
+    tags: list[Annotated[str, Field(max_length=50)]] = []
+    created_at: Optional[datetime] = None
+
+
+class PostImportError(BaseModel):
+    index: int
+    detail: str
+
+
+class PostImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: list[PostImportError] = []
+    # Причина досрочной остановки (потеря соединения): строки после неё не прочитаны
+    aborted: Optional[str] = None
+
+
+class PostFilter(BaseModel):
+    """Фильтры списка постов; все условия объединяются через AND."""
+    tag_ids: list[UUID] = []
+    tag_mode: Literal["any", "all"] = "any"
+    owner_id: Optional[UUID] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    title_prefix: Optional[str] = None
+
+
+class PostSearchHit(BaseModel):
+    """Результат поиска: заголовок и фрагмент текста с подсветкой <b>…</b>."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    title: str
+    headline: str
+    rank: float
+    created_at: datetime
+
+
+class PostSummary(BaseModel):
+    """Пост для списков: без content, с коротким excerpt и облегчённым автором."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    title: str
+    excerpt: str
+    owner: UserBrief
+    tags: List[TagBrief]
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class PostRef(BaseModel):
+    """Пост в normalized-формате: автор и теги — ссылками на users/tags ответа."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    title: str
+    content: str
+    owner_id: UUID
+    tag_ids: list[UUID]
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class PostSummaryRef(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    title: str
+    excerpt: str
+    owner_id: UUID
+    tag_ids: list[UUID]
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+P = TypeVar("P")
+U = TypeVar("U")
+
+
+class NormalizedPosts(BaseModel, Generic[P, U]):
+    """Страница постов, где каждый автор и тег встречается один раз."""
+    posts: list[P]
+    users: dict[UUID, U]
+    tags: dict[UUID, TagBrief]
+    next_cursor: Optional[str] = None
@@ -31,8 +31,14 @@ class TagRead(BaseModel):
     created_at: datetime
 
 
+class TagWithCount(TagRead):
+    post_count: int
+
+
 class TagWithPosts(TagRead):
+    """Тег с первой страницей постов; дальше — GET /tags/{id}/posts?cursor=next_cursor."""
     posts: list[PostBrief]
+    next_cursor: Optional[str] = None
 
 
 class TagResolveRequest(BaseModel):
@@ -0,0 +1,243 @@
+"""
+Замеры задержек и пропускной способности прямо в ASGI-приложении, на тестовой БД.
+
+    cd blog_app
+    python -m scripts.bench --seed-posts 2000 login-storm   # засеять один раз
+    python -m scripts.bench login-storm
+    python -m scripts.bench payload
+    python -m scripts.bench import --rows 50000
+    python -m scripts.bench serialize --limit 100
+
+Запросы идут в одном event loop, как в одном воркере uvicorn: всё, что блокирует loop,
+видно по хвосту задержек соседних запросов. Если ядер не больше PASSWORD_HASH_WORKERS,
+хвост растёт и без блокировки loop — потоки bcrypt отнимают у него CPU.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from urllib.parse import urlencode
+from uuid import UUID
+
+from fastapi import FastAPI
+from sqlalchemy import select, text
+
+import api
+from api.responses import json_response
+from api.routers.posts import POST_VIEW_SCHEMAS
+from api.streaming import NDJSON_MEDIA_TYPE
+from core.cache import response_cache
+from core.config import settings
+from core.db import AsyncSessionLocal, engine
+from core.query_stats import begin_request, end_request
+from core.security import create_jwt_token, get_password_hash
+from crud.post import with_view
+from models import Post
+from scripts.query_plans import explain_sql, seed
+from scripts.statement_budget import call
+
+BENCH_USERNAME = "bench_user"
+BENCH_PASSWORD = "bench-password"
+
+
+def percentiles(samples: list[float]) -> str:
+    if len(samples) < 2:
+        return f"n={len(samples)}"
+    q = statistics.quantiles(samples, n=100)
+    return f"n={len(samples):<6} p50={q[49] * 1000:8.2f} ms  p99={q[98] * 1000:8.2f} ms"
+
+
+async def ensure_bench_user(superuser: bool = False) -> UUID:
+    async with engine.begin() as conn:
+        return (
+            await conn.execute(
+                text(
+                    "INSERT INTO users (id, username, hashed_password, is_superuser) "
+                    "VALUES (gen_random_uuid(), :name, :hash, :superuser) "
+                    "ON CONFLICT (username) DO UPDATE "
+                    "SET hashed_password = excluded.hashed_password, is_superuser = excluded.is_superuser "
+                    "RETURNING id"
+                ),
+                {"name": BENCH_USERNAME, "hash": get_password_hash(BENCH_PASSWORD), "superuser": superuser},
+            )
+        ).scalar_one()
+
+
+async def _timed_loop(deadline: float, request, samples: list[float]) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await request()
+        samples.append(time.perf_counter() - started)
+
+
+async def login_storm(app: FastAPI, args: argparse.Namespace) -> int:
+    """p50/p99 чтения ленты без логинов и во время шторма логинов (bcrypt)."""
+    await ensure_bench_user()
+    form = urlencode({"username": BENCH_USERNAME, "password": BENCH_PASSWORD}).encode()
+    statuses: dict[int, int] = {}
+
+    async def read():
+        await call(app, "GET", args.path, args.query)
+
+    async def login():
+        status, _ = await call(
+            app, "POST", "/api/v1/auth/login", body=form,
+            headers=[("content-type", "application/x-www-form-urlencoded")],
+        )
+        statuses[status] = statuses.get(status, 0) + 1
+
+    await read()  # прогрев пула соединений
+    quiet: list[float] = []
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(*(_timed_loop(deadline, read, quiet) for _ in range(args.readers)))
+
+    storm: list[float] = []
+    logins: list[float] = []
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(
+        *(_timed_loop(deadline, read, storm) for _ in range(args.readers)),
+        *(_timed_loop(deadline, login, logins) for _ in range(args.logins)),
+    )
+
+    print(
+        f"GET {args.path}?{args.query} (readers={args.readers}, "
+        f"hash workers={settings.PASSWORD_HASH_WORKERS}, cpus={os.cpu_count()})"
+    )
+    print(f"  без логинов      {percentiles(quiet)}")
+    print(f"  шторм логинов    {percentiles(storm)}")
+    print(f"  POST /auth/login {percentiles(logins)}  статусы {dict(sorted(statuses.items()))}")
+    return 0
+
+
+async def payload(app: FastAPI, args: argparse.Namespace) -> int:
+    """Байты ответа и объём, прочитанный из БД, для view=full и view=summary."""
+    async with engine.connect() as conn:
+        for view in ("full", "summary"):
+            stats, token = begin_request({}, capture=True)
+            try:
+                status, body = await call(app, "GET", args.path, f"{args.query}&view={view}")
+            finally:
+                end_request(token)
+
+            # Верхний узел плана: буферы — накопительно по всему запросу, ширина строки — в байтах
+            blocks = row_bytes = 0
+            for sql, params in stats.captured:
+                if not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+                top = (await explain_sql(conn, sql, params))["Plan"]
+                blocks += top.get("Shared Hit Blocks", 0) + top.get("Shared Read Blocks", 0)
+                row_bytes += top["Actual Rows"] * top["Plan Width"]
+            print(
+                f"view={view:<8} HTTP {status}  ответ {len(body):>9} B  из БД ~{row_bytes:>9} B  "
+                f"буферов {blocks:>5}  выражений {stats.statements}  БД {stats.db_seconds * 1000:.1f} ms"
+            )
+    return 0
+
+
+async def bulk_import(app: FastAPI, args: argparse.Namespace) -> int:
+    """Строк в секунду у POST /posts/bulk: чистый NDJSON и с битыми строками (поиск их делением пачки)."""
+    token = create_jwt_token(subject=await ensure_bench_user(superuser=True), token_type="access")
+    headers = [("authorization", f"Bearer {token}"), ("content-type", NDJSON_MEDIA_TYPE)]
+    run_id = time.time_ns()
+
+    for bad_every in (0, args.bad_every):
+        lines = []
+        for i in range(args.rows):
+            # NUL в тексте Postgres не примет — ошибка всплывёт только в COPY
+            bad = bad_every and i % bad_every == 0
+            row = {"title": f"bench import {run_id} {i}", "content": "bad\x00" if bad else "lorem ipsum " * 40,
+                   "tags": [f"bench_tag_{i % 50}"]}
+            lines.append(json.dumps(row))
+        body = "\n".join(lines).encode()
+
+        started = time.perf_counter()
+        status, response = await call(app, "POST", "/api/v1/posts/bulk", body=body, headers=headers)
+        elapsed = time.perf_counter() - started
+        result = json.loads(response)
+        print(
+            f"битых 1/{bad_every or '-':<6} HTTP {status}  импортировано {result['imported']:>7}  "
+            f"ошибок {result['failed']:>5}  {elapsed:6.2f} s  {args.rows / elapsed:9.0f} строк/с"
+        )
+    return 0
+
+
+async def serialize(app: FastAPI, args: argparse.Namespace) -> int:
+    """req/s сериализации одних и тех же постов: response_model FastAPI против json_response."""
+    tp = list[POST_VIEW_SCHEMAS[args.view]]
+    async with AsyncSessionLocal() as session:
+        stmt = with_view(select(Post), args.view).order_by(Post.created_at.desc()).limit(args.limit)
+        posts = (await session.execute(stmt)).scalars().all()
+
+    # Отдельное приложение без БД: меряется только путь от ORM-объектов до байтов ответа
+    bench_app = FastAPI()
+
+    @bench_app.get("/response-model", response_model=tp)
+    async def via_response_model():
+        return posts
+
+    @bench_app.get("/json-bytes", response_model=tp)
+    async def via_json_bytes():
+        return json_response(tp, posts)
+
+    print(f"{len(posts)} постов, view={args.view}")
+    for path in ("/response-model", "/json-bytes"):
+        status, body = await call(bench_app, "GET", path)
+        samples: list[float] = []
+        await _timed_loop(time.perf_counter() + args.seconds, lambda: call(bench_app, "GET", path), samples)
+        print(
+            f"{path:<16} HTTP {status}  {len(body):>8} B  {len(samples) / sum(samples):8.1f} req/s  "
+            f"{percentiles(samples)}"
+        )
+    return 0
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed-posts", type=int, default=0, help="засеять столько постов перед замером")
+    parser.add_argument("--seconds", type=float, default=5.0, help="длительность каждой фазы")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    storm = commands.add_parser("login-storm", help=login_storm.__doc__)
+    storm.set_defaults(run=login_storm)
+    # Неполная лента дешевле: задержки bcrypt не тонут в сериализации тысяч постов
+    storm.add_argument("--path", default="/api/v1/posts/cursor")
+    storm.add_argument("--query", default="limit=20&view=summary")
+    storm.add_argument("--readers", type=int, default=4, help="параллельных читателей ленты")
+    storm.add_argument("--logins", type=int, default=32, help="параллельных логинов")
+
+    sizes = commands.add_parser("payload", help=payload.__doc__)
+    sizes.set_defaults(run=payload)
+    sizes.add_argument("--path", default="/api/v1/posts/cursor")
+    sizes.add_argument("--query", default="limit=100")
+
+    imports = commands.add_parser("import", help=bulk_import.__doc__)
+    imports.set_defaults(run=bulk_import)
+    imports.add_argument("--rows", type=int, default=50000)
+    imports.add_argument("--bad-every", type=int, default=1000, help="каждая N-я строка во втором прогоне битая")
+
+    dumps = commands.add_parser("serialize", help=serialize.__doc__)
+    dumps.set_defaults(run=serialize)
+    dumps.add_argument("--limit", type=int, default=100)
+    dumps.add_argument("--view", choices=sorted(POST_VIEW_SCHEMAS), default="full")
+
+    args = parser.parse_args()
+
+    if args.seed_posts:
+        async with engine.begin() as conn:
+            await seed(conn, max(args.seed_posts // 20, 10), args.seed_posts)
+
+    app = FastAPI()
+    app.include_router(api.router)
+    # Меряем обработку, а не попадания в кэш ответов
+    response_cache.enabled = False
+    try:
+        return await args.run(app, args)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
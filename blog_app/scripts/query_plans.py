@@ -0,0 +1,213 @@
+"""
+Повторяемая проверка планов запросов ленты на засеянной БД.
+
+    cd blog_app
+    python -m scripts.query_plans --seed-posts 10000000   # один раз, засеять
+    python -m scripts.query_plans                         # EXPLAIN (ANALYZE, BUFFERS)
+    python -m scripts.query_plans --max-ms 10             # и страницы не дольше 10 мс
+
+Скрипт падает с ненулевым кодом, если в плане горячего запроса есть
+Seq Scan по posts или узел Sort — значит, индекс не используется.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+from uuid import uuid4
+
+from sqlalchemy import Select, func, select, text, tuple_, literal
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.db import engine
+from crud.post import apply_filter
+from models import Post, posts_tags
+from schemas.post import PostFilter
+
+SEED_PREFIX = "seed_user_"
+SEED_TAG_PREFIX = "seed_tag_"
+
+
+async def seed(conn: AsyncConnection, users: int, posts: int) -> None:
+    await conn.execute(
+        text(
+            "INSERT INTO users (id, username, hashed_password) "
+            "SELECT gen_random_uuid(), :prefix || g, 'x' FROM generate_series(1, :n) g "
+            "ON CONFLICT DO NOTHING"
+        ),
+        {"prefix": SEED_PREFIX, "n": users},
+    )
+    # Посты равномерно по авторам, created_at — по секунде назад на пост
+    await conn.execute(
+        text(
+            "WITH u AS (SELECT array_agg(id) AS ids FROM users WHERE username LIKE :prefix || '%') "
+            "INSERT INTO posts (id, title, content, owner_id, created_at) "
+            "SELECT gen_random_uuid(), 'seed post ' || g, repeat('lorem ipsum ', 40), "
+            "u.ids[1 + g % array_length(u.ids, 1)], now() - make_interval(secs => g) "
+            "FROM u, generate_series(1, :n) g"
+        ),
+        {"prefix": SEED_PREFIX, "n": posts},
+    )
+    await conn.execute(text("ANALYZE users"))
+    await conn.execute(text("ANALYZE posts"))
+
+
+async def seed_tags(conn: AsyncConnection, tags: int) -> None:
+    await conn.execute(
+        text(
+            "INSERT INTO tags (id, name) SELECT gen_random_uuid(), :prefix || g "
+            "FROM generate_series(1, :n) g ON CONFLICT DO NOTHING"
+        ),
+        {"prefix": SEED_TAG_PREFIX, "n": tags},
+    )
+    # По три тега на ещё не размеченный пост, детерминированно от id
+    await conn.execute(
+        text(
+            "WITH t AS (SELECT array_agg(id) AS ids FROM tags WHERE name LIKE :prefix || '%') "
+            "INSERT INTO posts_tags (post_id, tag_id) "
+            "SELECT p.id, t.ids[1 + (abs(hashtext(p.id::text)) + k) % array_length(t.ids, 1)] "
+            "FROM posts p, t, generate_series(0, 2) k "
+            "WHERE NOT EXISTS (SELECT FROM posts_tags pt WHERE pt.post_id = p.id) ON CONFLICT DO NOTHING"
+        ),
+        {"prefix": SEED_TAG_PREFIX},
+    )
+    await conn.execute(text("ANALYZE tags"))
+    await conn.execute(text("ANALYZE posts_tags"))
+
+
+async def explain(conn: AsyncConnection, stmt: Select, analyze: bool = True) -> dict[str, Any]:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    return await explain_sql(conn, str(compiled), params, analyze=analyze)
+
+
+async def explain_sql(conn: AsyncConnection, sql: str, params: Any, analyze: bool = True) -> dict[str, Any]:
+    """EXPLAIN для уже скомпилированного SQL (например, перехваченного core.query_stats)."""
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    result = await conn.exec_driver_sql(f"EXPLAIN ({options}) {sql}", params)
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def iter_nodes(node: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from iter_nodes(child)
+
+
+def plan_problems(
+    plan: dict[str, Any],
+    tables: tuple[str, ...] = ("posts",),
+    sort: bool = True,
+    index: str | None = None,
+) -> list[str]:
+    problems = []
+    scans = set()
+    for node in iter_nodes(plan["Plan"]):
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in tables:
+            problems.append(f"Seq Scan on {node['Relation Name']}")
+        if sort and node["Node Type"] in ("Sort", "Incremental Sort"):
+            problems.append(f"{node['Node Type']} on {node.get('Sort Key')}")
+        if node["Node Type"] in ("Index Scan", "Index Only Scan"):
+            scans.add(node.get("Index Name"))
+    if index and index not in scans:
+        problems.append(f"no Index Scan using {index}")
+    return problems
+
+
+async def feed_statements(conn: AsyncConnection) -> dict[str, Select]:
+    # Курсор и автор берутся из середины данных, чтобы план был реалистичным
+    row = (
+        await conn.execute(
+            select(Post.created_at, Post.id, Post.owner_id)
+            .order_by(Post.created_at.desc(), Post.id.desc())
+            .offset(1000)
+            .limit(1)
+        )
+    ).one_or_none()
+    if row is None:
+        now = datetime.now(timezone.utc)
+        row = (now, uuid4(), uuid4())
+    created_at, post_id, owner_id = row
+
+    # Редкий и частый теги — два крайних плана для фильтра по тегам
+    tag_counts = (
+        await conn.execute(
+            select(posts_tags.c.tag_id).group_by(posts_tags.c.tag_id).order_by(func.count()).limit(1)
+            .union_all(
+                select(posts_tags.c.tag_id).group_by(posts_tags.c.tag_id).order_by(func.count().desc()).limit(1)
+            )
+        )
+    ).scalars().all()
+
+    key = tuple_(Post.created_at, Post.id)
+    order = (Post.created_at.desc(), Post.id.desc())
+
+    def page(f: PostFilter) -> Select:
+        return apply_filter(select(Post), f).order_by(*order).limit(21)
+
+    statements = {
+        "feed first page": select(Post).order_by(*order).limit(21),
+        "feed after cursor": (
+            select(Post)
+            .where(key < tuple_(literal(created_at, Post.created_at.type), literal(post_id, Post.id.type)))
+            .order_by(*order)
+            .limit(21)
+        ),
+        "posts of owner": page(PostFilter(owner_id=owner_id)),
+        "owner, date range": page(
+            PostFilter(owner_id=owner_id, created_after=created_at - timedelta(days=7), created_before=created_at)
+        ),
+        "date range": page(PostFilter(created_after=created_at - timedelta(days=1), created_before=created_at)),
+        "title prefix": apply_filter(select(Post), PostFilter(title_prefix="seed post 12"))
+        .order_by(Post.title.collate("C"))
+        .limit(21),
+    }
+    if tag_counts:
+        rare, popular = tag_counts[0], tag_counts[-1]
+        statements["rare tag"] = page(PostFilter(tag_ids=[rare]))
+        statements["popular tag"] = page(PostFilter(tag_ids=[popular]))
+        statements["two tags, all"] = page(PostFilter(tag_ids=[rare, popular], tag_mode="all"))
+    return statements
+
+
+# Фильтр по тегам идёт от posts_tags: посты тега сортируются после отбора (Sort над LIMIT)
+SORT_ALLOWED = {"rare tag", "popular tag", "two tags, all"}
+# Страница автора — обратный проход по (owner_id, created_at, id), без Sort
+INDEX_REQUIRED = {"posts of owner": "ix_posts_owner_id_created_at"}
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed-posts", type=int, default=0)
+    parser.add_argument("--seed-users", type=int, default=1000)
+    parser.add_argument("--verbose", action="store_true", help="печатать план целиком")
+    parser.add_argument("--max-ms", type=float, default=0, help="падать, если запрос дольше (0 — не проверять)")
+    args = parser.parse_args()
+
+    failed = False
+    async with engine.connect() as conn:
+        if args.seed_posts:
+            await seed(conn, args.seed_users, args.seed_posts)
+            await seed_tags(conn, max(args.seed_posts // 50, 10))
+            await conn.commit()
+
+        for name, stmt in (await feed_statements(conn)).items():
+            plan = await explain(conn, stmt)
+            problems = plan_problems(plan, sort=name not in SORT_ALLOWED, index=INDEX_REQUIRED.get(name))
+            if args.max_ms and plan["Execution Time"] > args.max_ms:
+                problems.append(f"slower than {args.max_ms} ms")
+            failed |= bool(problems)
+            status = "FAIL " + "; ".join(problems) if problems else "ok"
+            print(f"{name:<20} {plan['Execution Time']:>9.2f} ms  {status}")
+            if args.verbose or problems:
+                print(json.dumps(plan["Plan"], indent=2, default=str))
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
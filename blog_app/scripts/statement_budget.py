@@ -0,0 +1,327 @@
+"""
+Бюджет SQL-выражений на эндпоинт: ловит N+1 и лавины eager-загрузок.
+
+    cd blog_app
+    python -m scripts.statement_budget --posts 2000 --scale 10
+
+Только на пустой тестовой БД (с применёнными миграциями): скрипт засеивает данные и пишет через API.
+Каждый эндпоинт вызывается дважды — на исходных данных и после досева в --scale раз больше.
+Скрипт падает с ненулевым кодом, если эндпоинт превысил бюджет, если число выражений
+выросло вместе с данными, если в плане горячего SELECT на больших данных есть Seq Scan по posts
+или если у маршрута api.router нет ни одного кейса. GET /metrics в api.router не входит и в БД не ходит.
+
+Полный список /posts/ проверяется с фильтром по редкому тегу: без фильтра selectin-загрузка
+связей идёт пачками по 500 id, и число выражений растёт с данными по построению.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+from urllib.parse import urlencode
+from uuid import UUID, uuid4
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from starlette.routing import Match
+
+import api
+from api.dependencies import principal_cache
+from core.cache import response_cache
+from core.db import engine
+from core.query_stats import begin_request, end_request
+from core.security import create_jwt_token, get_password_hash
+from crud.tags import warm_tag_index
+from scripts.query_plans import SEED_PREFIX, SEED_TAG_PREFIX, explain_sql, plan_problems, seed, seed_tags
+
+ADMIN_USERNAME = "budget_admin"
+ADMIN_PASSWORD = "budget-password"
+# Слово в заголовках малой доли постов: поиск должен быть избирательным, как в жизни
+SEARCH_NEEDLE = "quasar"
+
+
+@dataclass
+class Case:
+    name: str
+    method: str
+    path: str
+    budget: int
+    query: str = ""
+    body: Optional[Any] = None
+    # форма (application/x-www-form-urlencoded) вместо JSON — для /auth/login
+    form: Optional[dict[str, str]] = None
+    # проверять планы SELECT'ов этого эндпоинта (пагинированные чтения по posts)
+    hot: bool = False
+
+
+def cases(ids: dict[str, Any]) -> list[Case]:
+    post, tag, task, user = ids["post"], ids["tag"], ids["task"], ids["admin"]
+    run = ids["run"]
+    return [
+        Case("posts list by tag", "GET", "/api/v1/posts/", 4, f"tag={tag}"),
+        Case("posts list summary", "GET", "/api/v1/posts/", 4, f"view=summary&tag={tag}"),
+        Case("posts list normalized", "GET", "/api/v1/posts/", 4, f"format=normalized&tag={tag}"),
+        Case("posts cursor", "GET", "/api/v1/posts/cursor", 4, "limit=50", hot=True),
+        Case("posts cursor summary", "GET", "/api/v1/posts/cursor", 4, "limit=50&view=summary", hot=True),
+        Case("posts cursor normalized", "GET", "/api/v1/posts/cursor", 4, "limit=50&format=normalized", hot=True),
+        Case("posts cursor by tag", "GET", "/api/v1/posts/cursor", 4, f"limit=50&tag={tag}", hot=True),
+        Case("posts search", "GET", "/api/v1/posts/search", 2, f"q={SEARCH_NEEDLE}&limit=50", hot=True),
+        Case("posts me", "GET", "/api/v1/posts/me", 5),
+        Case("post by id", "GET", f"/api/v1/posts/{post}", 4, hot=True),
+        Case("tags list", "GET", "/api/v1/tags/", 2),
+        Case("tags suggest", "GET", "/api/v1/tags/suggest", 0, "prefix=seed"),
+        Case("tag by id", "GET", f"/api/v1/tags/{tag}", 4, hot=True),
+        Case("tag posts", "GET", f"/api/v1/tags/{tag}/posts", 2, "limit=50", hot=True),
+        Case("tasks list", "GET", "/api/v1/tasks/", 2),
+        Case("task by id", "GET", f"/api/v1/tasks/{task}", 2),
+        Case("users list", "GET", "/api/v1/users/", 2),
+        Case("user by id", "GET", f"/api/v1/users/{user}", 2),
+        Case("auth me", "GET", "/api/v1/auth/me", 2),
+        # Только авторизация: одна выборка колонок пользователя, без связей (time_entries и т.п.)
+        Case("auth only (logout)", "POST", "/api/v1/auth/logout", 1),
+        Case("internal pool", "GET", "/api/v1/internal/pool", 1),
+        Case("post create", "POST", "/api/v1/posts/", 3, body={"title": "t", "content": "c", "tag_ids": [str(tag)]}),
+        Case("post update", "PATCH", f"/api/v1/posts/{post}", 3, body={"title": "t2", "tag_ids": [str(tag)]}),
+        Case("post delete", "DELETE", f"/api/v1/posts/{ids['doomed_post']}", 3),
+        Case(
+            "posts bulk", "POST", "/api/v1/posts/bulk", 4,
+            body=[{"title": f"bulk {i}", "content": "c", "tags": [f"{SEED_TAG_PREFIX}1"]} for i in range(3)],
+        ),
+        # Имена из tag_id_cache: только авторизация
+        Case("tags resolve", "POST", "/api/v1/tags/resolve", 1, body={"names": [f"{SEED_TAG_PREFIX}1"]}),
+        Case("tag create", "POST", "/api/v1/tags/", 4, body={"name": f"budget_tag_{run}"}),
+        Case("tag update", "PATCH", f"/api/v1/tags/{ids['doomed_tag']}", 4, body={"name": f"budget_renamed_{run}"}),
+        Case("tag delete", "DELETE", f"/api/v1/tags/{ids['doomed_tag']}", 3),
+        Case("task create", "POST", "/api/v1/tasks/", 3, body={"title": "t"}),
+        Case("auth register", "POST", "/api/v1/auth/register", 3,
+             body={"username": f"budget_reg_{run}", "password": ADMIN_PASSWORD}),
+        Case("auth login", "POST", "/api/v1/auth/login", 1, form={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD}),
+        Case("auth refresh", "POST", "/api/v1/auth/refresh", 1, body={"refresh_token": ids["refresh"]}),
+        Case("user revoke tokens", "POST", f"/api/v1/users/{ids['doomed_user']}/revoke-tokens", 2),
+        Case("user delete", "DELETE", f"/api/v1/users/{ids['doomed_user']}", 2),
+    ]
+
+
+def uncovered_routes(case_list: list[Case]) -> list[str]:
+    """Маршруты api.router, на которые не пришёлся ни один кейс (первое совпадение — как в роутере)."""
+    covered = []
+    for case in case_list:
+        scope = {"type": "http", "path": case.path, "method": case.method}
+        covered.append(next((r for r in api.router.routes if r.matches(scope)[0] == Match.FULL), None))
+    return [
+        f"{method} {route.path}"
+        for route in api.router.routes
+        if route not in covered
+        for method in sorted(route.methods)
+    ]
+
+
+async def seed_extras(conn: AsyncConnection, tags: int, tasks: int, needles: int) -> None:
+    await seed_tags(conn, tags)
+    await conn.execute(
+        text(
+            "UPDATE posts SET title = title || ' ' || :needle WHERE id IN ("
+            "SELECT id FROM posts WHERE title NOT LIKE '%' || :needle ORDER BY id LIMIT :n)"
+        ),
+        {"needle": SEARCH_NEEDLE, "n": needles},
+    )
+    await conn.execute(
+        text(
+            "WITH u AS (SELECT array_agg(id) AS ids FROM users WHERE username LIKE :prefix || '%') "
+            "INSERT INTO tasks (id, title, status, owner_id) "
+            "SELECT gen_random_uuid(), 'seed task ' || g, 'CREATED', u.ids[1 + g % array_length(u.ids, 1)] "
+            "FROM u, generate_series(1, :n) g"
+        ),
+        {"prefix": SEED_PREFIX, "n": tasks},
+    )
+    await conn.execute(text("ANALYZE"))
+
+
+async def _scalar(conn: AsyncConnection, sql: str) -> Any:
+    return (await conn.execute(text(sql))).scalar_one()
+
+
+async def seed_all(conn: AsyncConnection, posts: int) -> dict[str, Any]:
+    await seed(conn, max(posts // 20, 10), posts)
+    await seed_extras(conn, max(posts // 50, 10), max(posts // 10, 10), max(posts // 1000, 1))
+    admin_id, token_version = (
+        await conn.execute(
+            text(
+                "INSERT INTO users (id, username, hashed_password, is_superuser) "
+                "VALUES (gen_random_uuid(), :name, :hash, true) "
+                "ON CONFLICT (username) DO UPDATE SET hashed_password = excluded.hashed_password, is_superuser = true "
+                "RETURNING id, token_version"
+            ),
+            {"name": ADMIN_USERNAME, "hash": get_password_hash(ADMIN_PASSWORD)},
+        )
+    ).one()
+    # Автору-админу — тоже посты, чтобы /posts/me не был пустым
+    await conn.execute(
+        text("UPDATE posts SET owner_id = :admin WHERE id IN (SELECT id FROM posts ORDER BY id LIMIT 50)"),
+        {"admin": admin_id},
+    )
+    await conn.commit()
+
+    return {
+        "admin": admin_id,
+        "refresh": create_jwt_token(subject=admin_id, token_type="refresh", extra_claims={"ver": token_version}),
+        "post": await _scalar(conn, "SELECT id FROM posts ORDER BY created_at DESC LIMIT 1"),
+        # Самый редкий тег: выборки по нему не растут с досевом, а планы остаются индексными
+        "tag": await _scalar(conn, "SELECT tag_id FROM posts_tags GROUP BY tag_id ORDER BY count(*), tag_id LIMIT 1"),
+        "task": await _scalar(conn, "SELECT id FROM tasks LIMIT 1"),
+    }
+
+
+async def doomed_rows(conn: AsyncConnection, admin_id: UUID) -> dict[str, Any]:
+    """Свои пост, тег и пользователь на каждый прогон — их удаляют и переименовывают кейсы записи."""
+    run = uuid4().hex[:8]
+    user_id = (
+        await conn.execute(
+            text("INSERT INTO users (id, username, hashed_password) VALUES (gen_random_uuid(), :name, 'x') RETURNING id"),
+            {"name": f"budget_doomed_{run}"},
+        )
+    ).scalar_one()
+    tag_id = (
+        await conn.execute(
+            text("INSERT INTO tags (id, name) VALUES (gen_random_uuid(), :name) RETURNING id"),
+            {"name": f"budget_doomed_{run}"},
+        )
+    ).scalar_one()
+    post_id = (
+        await conn.execute(
+            text(
+                "INSERT INTO posts (id, title, content, owner_id) "
+                "VALUES (gen_random_uuid(), 'doomed', 'doomed', :owner) RETURNING id"
+            ),
+            {"owner": admin_id},
+        )
+    ).scalar_one()
+    await conn.execute(
+        text("INSERT INTO posts_tags (post_id, tag_id) VALUES (:post, :tag)"), {"post": post_id, "tag": tag_id}
+    )
+    await conn.commit()
+    return {"run": run, "doomed_user": user_id, "doomed_tag": tag_id, "doomed_post": post_id}
+
+
+async def call(
+    app: FastAPI,
+    method: str,
+    path: str,
+    query: str = "",
+    body: bytes = b"",
+    headers: Sequence[tuple[str, str]] = (),
+) -> tuple[int, bytes]:
+    """Один запрос прямо в ASGI-приложение, в текущей задаче — чтобы core.query_stats видел выражения."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"budget"), *((k.lower().encode(), v.encode()) for k, v in headers)],
+        "client": ("127.0.0.1", 0),
+        "server": ("budget", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    return status, b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+def call_case(app: FastAPI, case: Case, token: str):
+    headers = [("authorization", f"Bearer {token}")]
+    body = b""
+    if case.form is not None:
+        body = urlencode(case.form).encode()
+        headers.append(("content-type", "application/x-www-form-urlencoded"))
+    elif case.body is not None:
+        body = json.dumps(case.body).encode()
+        headers.append(("content-type", "application/json"))
+    return call(app, case.method, case.path, case.query, body, headers)
+
+
+async def measure(
+    app: FastAPI, conn: AsyncConnection, case: Case, token: str, plans: bool
+) -> tuple[int, list[str]]:
+    # Каждый вызов — с холодными кэшами авторизации и ответов: считаем худший случай
+    principal_cache.clear()
+    stats, token_ = begin_request({}, capture=True)
+    try:
+        status, body = await call_case(app, case, token)
+    finally:
+        end_request(token_)
+
+    problems = []
+    if status >= 400:
+        problems.append(f"HTTP {status}: {body[:200].decode(errors='replace')}")
+    # На малых данных Seq Scan законен — планы смотрим только после досева
+    if case.hot and plans:
+        for sql, params in stats.captured:
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            plan = await explain_sql(conn, sql, params, analyze=False)
+            problems += [f"{p} in: {sql[:120]}" for p in plan_problems(plan, sort=False)]
+    return stats.statements, problems
+
+
+async def run(
+    app: FastAPI, conn: AsyncConnection, ids: dict[str, Any], token: str, plans: bool
+) -> tuple[list[Case], dict[str, tuple[int, list[str]]]]:
+    await warm_tag_index()
+    case_list = cases({**ids, **await doomed_rows(conn, ids["admin"])})
+    return case_list, {case.name: await measure(app, conn, case, token, plans) for case in case_list}
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=2000, help="постов в первом прогоне")
+    parser.add_argument("--scale", type=int, default=10, help="во сколько раз больше данных во втором прогоне")
+    args = parser.parse_args()
+
+    app = FastAPI()
+    app.include_router(api.router)
+    response_cache.enabled = False
+
+    async with engine.connect() as conn:
+        ids = await seed_all(conn, args.posts)
+        token = create_jwt_token(subject=ids["admin"], token_type="access")
+        _, small = await run(app, conn, ids, token, plans=False)
+        await seed_all(conn, args.posts * (args.scale - 1))
+        case_list, large = await run(app, conn, ids, token, plans=True)
+    await engine.dispose()
+
+    failed = False
+    for route in uncovered_routes(case_list):
+        failed = True
+        print(f"{route:<40} FAIL no case")
+    budgets = {case.name: case.budget for case in case_list}
+    for name, budget in budgets.items():
+        (n_small, p_small), (n_large, p_large) = small[name], large[name]
+        problems = [*dict.fromkeys(p_small + p_large)]
+        if n_large > budget:
+            problems.append(f"over budget {budget}")
+        if n_large != n_small:
+            problems.append(f"grows with data: {n_small} -> {n_large}")
+        failed |= bool(problems)
+        status = "FAIL " + "; ".join(problems) if problems else "ok"
+        print(f"{name:<26} {n_small:>3} / {n_large:>3} (budget {budget})  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,37 @@
+import base64
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import DateTime, Uuid, column
+
+from api.pagination import decode_cursor, encode_cursor
+
+KEY = (column("created_at", DateTime(timezone=True)), column("id", Uuid()))
+
+
+def _raw_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).rstrip(b"=").decode()
+
+
+def test_cursor_round_trip():
+    values = [datetime(2026, 1, 1, tzinfo=timezone.utc), uuid4()]
+    assert decode_cursor(encode_cursor(values), KEY) == values
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        ["2026-01-01T00:00:00", 5],
+        ["2026-01-01T00:00:00", ["x"]],
+        [{"a": 1}, str(uuid4())],
+        ["not a date", str(uuid4())],
+        ["2026-01-01T00:00:00"],
+    ],
+)
+def test_wrong_typed_cursor_is_400(values):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(_raw_cursor(values), KEY)
+    assert exc.value.status_code == 400
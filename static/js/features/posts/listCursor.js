@@ -17,7 +17,7 @@ async function loadPosts(cursor = null) {
     try {
         let url = "/api/v1/posts/cursor?limit=10";
         if (cursor) {
-            url += `&cursor=${cursor}`;
+            url += `&cursor=${encodeURIComponent(cursor)}`;
         }
 
         const response = await fetch(url, {
@@ -32,10 +32,10 @@ async function loadPosts(cursor = null) {
         }
 
         if (response.ok) {
-            const posts = await response.json();
-            displayPosts(posts, !cursor); // !cursor = first load
-            currentCursor = posts.length > 0 ? posts[posts.length - 1].id : null;
-            hasMore = posts.length === 10; // Если пришло 10 постов, значит есть еще
+            const page = await response.json();
+            displayPosts(page.items, !cursor); // !cursor = first load
+            currentCursor = page.next_cursor;
+            hasMore = page.next_cursor !== null; // Курсор есть только если есть следующая страница
         } else {
             console.error("Error loading posts:", response.status);
         }
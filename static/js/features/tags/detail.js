@@ -44,23 +44,19 @@ function getTagIdFromUrl() {
 
 function displayTagDetail(tag) {
     const tagDetail = document.getElementById("tag-detail");
+    tagPostsCursor = tag.next_cursor;
 
     tagDetail.innerHTML = `
         <div style="border: 1px solid #ccc; padding: 20px; border-radius: 5px; max-width: 800px; margin: 0 auto;">
             <h2 style="margin: 0 0 20px 0;">${tag.name}</h2>
 
             ${tag.posts && tag.posts.length > 0 ? `
-                <h3>Посты с тегом (${tag.posts.length}):</h3>
-                <div style="margin-top: 15px;">
-                    ${tag.posts.map(post => `
-                        <div style="border: 1px solid #eee; padding: 10px; margin: 10px 0; border-radius: 5px;">
-                            <h4 style="margin: 0 0 5px 0;">${post.title}</h4>
-                            <small>Создан: ${new Date(post.created_at).toLocaleDateString()}</small>
-                            <br>
-                            <button onclick="openPostDetail('${post.id}')">Открыть пост</button>
-                        </div>
-                    `).join('')}
+                <h3>Посты с тегом:</h3>
+                <div id="tag-posts" style="margin-top: 15px;">
+                    ${renderTagPosts(tag.posts)}
                 </div>
+                <button id="tag-posts-more" style="${tag.next_cursor ? '' : 'display: none;'}"
+                    onclick="loadMoreTagPosts('${tag.id}')">Показать ещё</button>
             ` : '<p>Нет постов с этим тегом</p>'}
 
 
@@ -73,6 +69,46 @@ function displayTagDetail(tag) {
     `;
 }
 
+let tagPostsCursor = null;
+
+function renderTagPosts(posts) {
+    return posts.map(post => `
+        <div style="border: 1px solid #eee; padding: 10px; margin: 10px 0; border-radius: 5px;">
+            <h4 style="margin: 0 0 5px 0;">${post.title}</h4>
+            <small>Создан: ${new Date(post.created_at).toLocaleDateString()}</small>
+            <br>
+            <button onclick="openPostDetail('${post.id}')">Открыть пост</button>
+        </div>
+    `).join('');
+}
+
+// Следующие страницы постов тега
+async function loadMoreTagPosts(tagId) {
+    if (!tagPostsCursor) return;
+
+    try {
+        const response = await fetch(`/api/v1/tags/${tagId}/posts?cursor=${encodeURIComponent(tagPostsCursor)}`, {
+            headers: {
+                "Authorization": `Bearer ${getToken()}`
+            }
+        });
+
+        if (response.ok) {
+            const page = await response.json();
+            document.getElementById("tag-posts").innerHTML += renderTagPosts(page.items);
+            tagPostsCursor = page.next_cursor;
+            if (!tagPostsCursor) {
+                document.getElementById("tag-posts-more").style.display = "none";
+            }
+        } else {
+            showMessage("Ошибка загрузки", "red");
+        }
+    } catch (error) {
+        console.error("Error loading tag posts:", error);
+        showMessage("Ошибка загрузки", "red");
+    }
+}
+
 function openPostDetail(postId) {
     window.location.href = `/static/templates/posts/detail.html?id=${postId}`;
 }
@@ -43,6 +43,7 @@ function displayAllTags(tags) {
         <div style="border: 1px solid #ccc; padding: 15px; margin: 10px 0; border-radius: 5px; cursor: pointer;"
             onclick="openPostDetail('${tag.id}')">
             <h3 style="margin: 0 0 10px 0;">${tag.name}</h3>
+            <div>Постов: ${tag.post_count}</div>
 
             <small style="color: #666;">Создан: ${new Date(tag.created_at).toLocaleDateString()}</small>
             <button onclick="event.stopPropagation(); openTagDetail('${tag.id}')">Подробнее</button>
@@ -0,0 +1,41 @@
+// static/js/features/tags/suggest.js
+
+// Подсказки существующих тегов для поля "теги через запятую"
+document.addEventListener("DOMContentLoaded", () => {
+    const input = document.getElementById("post-tags");
+    if (!input) return;
+
+    const list = document.createElement("datalist");
+    list.id = "post-tags-suggest";
+    input.after(list);
+    input.setAttribute("list", list.id);
+    input.setAttribute("autocomplete", "off");
+
+    let timer = null;
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => suggestTags(input, list), 150);
+    });
+});
+
+async function suggestTags(input, list) {
+    // Подсказываем только для последнего тега в строке
+    const parts = input.value.split(",");
+    const prefix = parts.pop().trim().toLowerCase();
+    list.innerHTML = "";
+    if (!prefix) return;
+
+    try {
+        const res = await fetch(`/api/v1/tags/suggest?prefix=${encodeURIComponent(prefix)}`);
+        if (!res.ok) return;
+        const tags = await res.json(); // [{id, name}]
+        const head = parts.map((t) => t.trim()).filter(Boolean);
+        for (const tag of tags) {
+            const option = document.createElement("option");
+            option.value = [...head, tag.name].join(", ");
+            list.appendChild(option);
+        }
+    } catch (e) {
+        console.error("Error suggesting tags:", e);
+    }
+}